@@ -1,12 +1,14 @@
 from PIL import Image
 import cv2
-import torch
 import os
+import importlib.util
 import time
 import threading
+import queue
 import numpy as np
 import logging
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 
 warnings.filterwarnings("ignore", category=FutureWarning)
 warnings.filterwarnings("ignore", category=UserWarning)
@@ -22,214 +24,695 @@ except ImportError:
     helper = None
 
 try:
-    import pytesseract
-    TESSERACT_AVAILABLE = True
+    from function.lpr_backends import HubYolo, OnnxYolo, TorchScriptYolo
 except ImportError:
-    TESSERACT_AVAILABLE = False
+    HubYolo = OnnxYolo = TorchScriptYolo = None
+
+from function.yolo_numpy import LetterboxBuffer, autoshape_input_shape, scale_boxes
+from function import enhance
+from function import resource_governor
+
+from function.plate_cache import PlateCache, cache_key
+from function.lpr_profiles import ProfileStore
+from function.plate_prefilter import PlatePrefilter, DEFAULT_THRESHOLD as PREFILTER_THRESHOLD
+
+from function.tesseract_pool import TesseractPool, AVAILABLE as TESSERACT_AVAILABLE
+
+def _import_torch():
+    # torch is only imported by the torchscript / torch.hub backends, the onnx backend never loads it
+    try:
+        import torch
+    except ImportError:
+        raise RuntimeError("torch is not installed, use lpr_backend='onnx'") from None
+    return torch
+
+class LPRReplica:
+    def __init__(self, index: int, detector, ocr, letterbox: LetterboxBuffer | None = None):
+        self.index = index
+        self.detector = detector
+        self.ocr = ocr
+        self.detector_conf = getattr(detector, 'conf', None)  # load-time threshold, used when a profile sets none
+        self.letterbox = letterbox or LetterboxBuffer()  # detector input, reused by every call on this replica
+        # the pool hands out the detector, the OCR model has its own lock so one frame can be OCR'd
+        # while the next is detected on the same replica (lpr_pipeline.py)
+        self.ocr_lock = threading.Lock()
 
 class OptimizedLPR:
     LP_DETECTOR_MODEL_PATH = 'model/LP_detector_nano_61.pt'
     OCR_MODEL_PATH = 'model/LP_ocr_nano_62.pt'
+    LP_DETECTOR_ONNX_PATH = 'model/LP_detector_nano_61.onnx'
+    OCR_ONNX_PATH = 'model/LP_ocr_nano_62.onnx'
+    LP_DETECTOR_TS_PATH = 'model/LP_detector_nano_61.torchscript'
+    OCR_TS_PATH = 'model/LP_ocr_nano_62.torchscript'
+    DEFAULT_BACKEND = 'auto'
+    PRECISIONS = ('fp32', 'int8')
+    DEFAULT_PRECISION = 'fp32'
+    STAGES = ('detect', 'ocr')
+    WARMUP_RUNS = 2
+    WARMUP_FRAME_SHAPE = (480, 640, 3)  # camera resolution set in GUIManager.init_cameras
+    WARMUP_OCR_CROP_SIZES = [(60, 260), (140, 190), (45, 120)]
     DEFAULT_DETECTOR_CONF = 0.4
     DEFAULT_OCR_CONF = 0.5
+    DETECTOR_INPUT_SIZE = 640
     MAX_FRAME_WIDTH_RESIZE = 1280
+    CLAHE_CLIP_LIMIT = 2.0
+    CLAHE_TILE_GRID = (8, 8)
     MIN_PLATE_WIDTH_OCR = 100
     PLATE_CROP_PADDING = 5
     MIN_AREA_THRESHOLD = 1000
     CACHE_TIMEOUT = 2.0
-
-    def __init__(self):
+    # recognition cascade: cheap detector pass first, expensive stages only for frames / crops that need them
+    CASCADE_FAST_SIZE = 416
+    CASCADE_DETECT_CONF = 0.6
+    CASCADE_OCR_CONF = 0.6
+    OCR_STAGES = ('ocr', 'deskew', 'multiscale', 'tesseract')
+    MULTISCALE_FACTORS = (1.5, 2.0)
+    DESKEW_MIN_ANGLE = 2.0
+    TESSERACT_WORKERS = 1
+    TESSERACT_TIMEOUT = 1.0
+    CACHE_MAX_SIZE = 128
+
+    def __init__(self, config: dict | None = None):
+        self.config = config or {}
+        self.backend = self.config.get('lpr_backend', self.DEFAULT_BACKEND)
+        self.mmap_weights = self.config.get('lpr_mmap_weights', False)
+        self.precision = self.config.get('lpr_precision', self.DEFAULT_PRECISION)
+        if self.precision not in self.PRECISIONS:
+            raise ValueError(f"lpr_precision must be one of {', '.join(self.PRECISIONS)}")
+        self.cascade = self.config.get('lpr_cascade', True)
+        self.num_replicas = max(1, int(self.config.get('lpr_replicas', 1)))
+        self.threads_per_replica = (self.config.get('lpr_threads_per_replica')
+                                    or resource_governor.threads_per_worker(self.num_replicas))
+        self.active_backend = None
+        self.active_precision = None
+        self.load_stats = {}
         self.yolo_LP_detect = None
         self.yolo_license_plate = None
-        self.processing_lock = threading.Lock()
+        self.replicas = []
+        self.replica_pool = queue.Queue()
+        self.load_lock = threading.Lock()
+        self.hub_lock = threading.Lock()
+        self.stages_ready = dict.fromkeys(self.STAGES, False)
         self.models_loaded = False
-        self.plate_cache = {}
+        self.plate_cache = PlateCache(max_size=int(self.config.get('lpr_cache_size', self.CACHE_MAX_SIZE)),
+                                      ttl=float(self.config.get('lpr_cache_ttl', self.CACHE_TIMEOUT)))
+        self.tesseract_pool = TesseractPool(
+            workers=int(self.config.get('lpr_tesseract_workers', self.TESSERACT_WORKERS)),
+            timeout=float(self.config.get('lpr_tesseract_timeout', self.TESSERACT_TIMEOUT))
+        ) if TESSERACT_AVAILABLE else None
+        self.profiles = ProfileStore(self.config.get('lpr_profiles'), self.config.get('lpr_profiles_file'),
+                                     defaults={'input_size': self.DETECTOR_INPUT_SIZE,
+                                               'min_area': self.MIN_AREA_THRESHOLD})
+        # frames without plate-like edges skip the detector (see function/plate_prefilter.py)
+        self.prefilter = PlatePrefilter(float(self.config.get('lpr_prefilter_threshold', PREFILTER_THRESHOLD))
+                                        ) if self.config.get('lpr_prefilter', False) else None
 
     def load_models(self) -> bool:
-        if self.models_loaded:
-            return True
-
-        try:
-            with warnings.catch_warnings():
-                warnings.simplefilter("ignore")
-                
-                device = 'cuda' if torch.cuda.is_available() else 'cpu'
-                
-                if os.path.exists(self.LP_DETECTOR_MODEL_PATH):
-                    self.yolo_LP_detect = torch.hub.load(
-                        'ultralytics/yolov5', 'custom',
-                        path=self.LP_DETECTOR_MODEL_PATH,
-                        force_reload=False,
-                        device=device,
-                        trust_repo=True
-                    )
-                    self.yolo_LP_detect.conf = self.DEFAULT_DETECTOR_CONF
-                else:
-                    self.yolo_LP_detect = torch.hub.load('ultralytics/yolov5', 'yolov5s', device=device, trust_repo=True)
-                    self.yolo_LP_detect.conf = 0.3
-
-                if os.path.exists(self.OCR_MODEL_PATH):
-                    self.yolo_license_plate = torch.hub.load(
-                        'ultralytics/yolov5', 'custom',
-                        path=self.OCR_MODEL_PATH,
-                        force_reload=False,
-                        device=device,
-                        trust_repo=True
-                    )
-                    self.yolo_license_plate.conf = self.DEFAULT_OCR_CONF
-                
-                dummy_frame = np.zeros((640, 640, 3), dtype=np.uint8)
-                _ = self.yolo_LP_detect(dummy_frame, size=640)
-
-            self.models_loaded = True
-            return True
+        with self.load_lock:
+            if self.models_loaded:
+                return True
 
-        except Exception as e:
-            logging.error(f"Failed to load models: {e}")
-            return False
+            try:
+                start = time.perf_counter()
+                backend = self._resolve_backend()
+                self.active_precision = self._resolve_precision(backend)
+                if backend != 'onnx':
+                    _import_torch()  # before apply(), which only sizes the torch pools once torch is loaded
+                # torch intra-op / OpenCV threads are process-wide, so the budget is split between replicas
+                resource_governor.apply(self.threads_per_replica)
+
+                tasks = [(index, stage) for index in range(self.num_replicas) for stage in self.STAGES]
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore")
+                    with ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix='lpr-load',
+                                            initializer=resource_governor.thread_initializer('inference')) as pool:
+                        futures = {task: pool.submit(self._load_stage, backend, task[1], start) for task in tasks}
+                        results = {task: future.result() for task, future in futures.items()}
+
+                ready = time.perf_counter()
+                # CLAHE cost for the enhance savings estimate, measured here instead of on the first car
+                enhance.calibrate((self.DETECTOR_INPUT_SIZE, self.DETECTOR_INPUT_SIZE, 3),
+                                  self.CLAHE_CLIP_LIMIT, self.CLAHE_TILE_GRID)
+                self.replicas = [LPRReplica(index, results[(index, 'detect')][0], results[(index, 'ocr')][0],
+                                            results[(index, 'detect')][3])
+                                 for index in range(self.num_replicas)]
+                for replica in self.replicas:
+                    self.replica_pool.put(replica)
+                self.yolo_LP_detect = self.replicas[0].detector
+                self.yolo_license_plate = self.replicas[0].ocr
+                self.active_backend = backend
+                self.load_stats = {'backend': backend, 'precision': self.active_precision,
+                                   'replicas': self.num_replicas,
+                                   'threads_per_replica': self.threads_per_replica,
+                                   'cold_start_s': ready - start}
+                for stage in self.STAGES:
+                    self.load_stats[f'{stage}_load_s'] = max(results[(i, stage)][1] for i in range(self.num_replicas))
+                    self.load_stats[f'{stage}_warmup_s'] = max(results[(i, stage)][2] for i in range(self.num_replicas))
+                logging.info(f"LPR models ready ({backend} {self.active_precision}, {self.num_replicas} replica(s) x "
+                             f"{self.threads_per_replica} thread(s)): " + ", ".join(
+                                 f"{stage} load {self.load_stats[f'{stage}_load_s']:.2f}s + "
+                                 f"warm-up {self.load_stats[f'{stage}_warmup_s']:.2f}s" for stage in self.STAGES
+                             ) + f", cold start {ready - start:.2f}s")
+                self.models_loaded = True
+                return True
 
-    def preprocess_frame(self, frame: np.ndarray) -> np.ndarray:
+            except Exception as e:
+                logging.error(f"Failed to load models: {e}")
+                return False
+
+    def _load_stage(self, backend: str, stage: str, start: float):
+        model = self._load_model(backend, stage)
+        loaded = time.perf_counter()
+        # the detector is warmed through the input buffer its replica will use
+        letterbox = LetterboxBuffer() if stage == 'detect' else None
+        self._warm_up(stage, model, letterbox)
+        self.stages_ready[stage] = True
+        return model, loaded - start, time.perf_counter() - loaded, letterbox
+
+    def _warm_up(self, stage: str, model, letterbox: LetterboxBuffer | None = None):
+        if model is None:
+            return
+        if stage == 'detect':
+            # the input shapes the cascade really runs: each camera ROI at the fast and at the profile size
+            letterbox = letterbox or LetterboxBuffer()
+            for roi_shape, size in self._warmup_detector_shapes(model.stride):
+                dummy_roi = np.zeros(roi_shape, dtype=np.uint8)
+                for _ in range(self.WARMUP_RUNS):
+                    x, _, _ = letterbox.load([dummy_roi], size, model.stride)
+                    model.detect_letterboxed(x)
+            return
+        # OCR input shape follows the crop aspect ratio, warm the typical 1-line / 2-line plate shapes
+        for height, width in self.WARMUP_OCR_CROP_SIZES:
+            dummy_crop = np.full((height, width, 3), 114, dtype=np.uint8)
+            for _ in range(self.WARMUP_RUNS):
+                if helper:
+                    helper.read_plate(model, dummy_crop)
+                else:
+                    model(dummy_crop)
+
+    def _warmup_detector_shapes(self, stride: int) -> list:
+        frame = np.zeros(self.WARMUP_FRAME_SHAPE, dtype=np.uint8)
+        shapes = {}
+        for profile in self.profiles.all():
+            roi_shape = profile.crop(frame)[0].shape
+            sizes = {profile.input_size}
+            if self.cascade:
+                sizes.add(min(self.CASCADE_FAST_SIZE, profile.input_size))
+            for size in sizes:
+                # profiles sharing a network input shape are warmed once
+                shapes.setdefault(tuple(autoshape_input_shape([roi_shape[:2]], size, stride)), (roi_shape, size))
+        return list(shapes.values())
+
+    @staticmethod
+    def weights_path(model_path: str) -> str:
+        return os.path.splitext(model_path)[0] + '.weights'
+
+    @staticmethod
+    def int8_path(onnx_path: str) -> str:
+        return os.path.splitext(onnx_path)[0] + '.int8.onnx'
+
+    def _resolve_backend(self) -> str:
+        if self.backend != 'auto':
+            return self.backend
+        if (self.precision == 'int8' and OnnxYolo and importlib.util.find_spec('onnxruntime')
+                and os.path.exists(self.int8_path(self.LP_DETECTOR_ONNX_PATH))
+                and os.path.exists(self.int8_path(self.OCR_ONNX_PATH))):
+            return 'onnx'
+        if (TorchScriptYolo and importlib.util.find_spec('torch')
+                and os.path.exists(self.LP_DETECTOR_TS_PATH) and os.path.exists(self.OCR_TS_PATH)):
+            return 'torchscript'
+        if (OnnxYolo and importlib.util.find_spec('onnxruntime')
+                and os.path.exists(self.LP_DETECTOR_ONNX_PATH) and os.path.exists(self.OCR_ONNX_PATH)):
+            return 'onnx'
+        logging.warning("No exported LPR models in model/, falling back to torch.hub")
+        return 'torch'
+
+    def _resolve_precision(self, backend: str) -> str:
+        # the int8 models are onnxruntime dynamic quantized graphs, other backends always run fp32
+        if self.precision == 'int8' and backend != 'onnx':
+            logging.warning(f"lpr_precision 'int8' needs the onnx backend, running {backend} in fp32")
+            return 'fp32'
+        return self.precision
+
+    def _load_model(self, backend: str, stage: str):
+        if stage == 'detect':
+            pt_path, onnx_path, ts_path = self.LP_DETECTOR_MODEL_PATH, self.LP_DETECTOR_ONNX_PATH, self.LP_DETECTOR_TS_PATH
+            conf = self.DEFAULT_DETECTOR_CONF
+        else:
+            pt_path, onnx_path, ts_path = self.OCR_MODEL_PATH, self.OCR_ONNX_PATH, self.OCR_TS_PATH
+            conf = self.DEFAULT_OCR_CONF
+
+        if backend == 'onnx':
+            if OnnxYolo is None:
+                raise RuntimeError("onnxruntime backend is not available")
+            if self.active_precision == 'int8':
+                onnx_path = self.int8_path(onnx_path)
+                if not os.path.exists(onnx_path):
+                    raise FileNotFoundError(f"{onnx_path} not found, run quantize_models.py first")
+            if not os.path.exists(onnx_path):
+                raise FileNotFoundError(f"{onnx_path} not found, run export_models.py first")
+            return OnnxYolo(onnx_path, conf=conf, threads=self.threads_per_replica)
+
+        if backend == 'torchscript':
+            if TorchScriptYolo is None:
+                raise RuntimeError("torchscript backend is not available")
+            _import_torch()
+            if not os.path.exists(ts_path):
+                raise FileNotFoundError(f"{ts_path} not found, run export_models.py first")
+            weights = self.weights_path(ts_path)
+            return TorchScriptYolo(ts_path, conf=conf,
+                                   weights_path=weights if self.mmap_weights and os.path.exists(weights) else None)
+
+        return self._load_hub_model(stage, pt_path, conf)
+
+    def _load_hub_model(self, stage: str, pt_path: str, conf: float):
+        torch = _import_torch()
+        device = 'cuda' if torch.cuda.is_available() else 'cpu'
+
+        # torch.hub imports the yolov5 repo through sys.path, so hub loads are not run concurrently
+        with self.hub_lock:
+            if os.path.exists(pt_path):
+                model = torch.hub.load(
+                    'ultralytics/yolov5', 'custom',
+                    path=pt_path,
+                    force_reload=False,
+                    device=device,
+                    trust_repo=True
+                )
+            elif stage == 'detect':
+                model = torch.hub.load('ultralytics/yolov5', 'yolov5s', device=device, trust_repo=True)
+                conf = 0.3
+            else:
+                return None
+        if HubYolo is None:
+            model.conf = conf
+            return model
+        return HubYolo(model, conf=conf)
+
+    @staticmethod
+    def _to_numpy(boxes) -> np.ndarray:
+        return boxes.cpu().numpy() if hasattr(boxes, 'cpu') else np.asarray(boxes)
+
+    def preprocess_frame(self, frame: np.ndarray, max_width: int | None = None) -> np.ndarray:
         if frame is None or frame.size == 0:
             return frame
 
         try:
             height, width = frame.shape[:2]
+            max_width = max_width or self.MAX_FRAME_WIDTH_RESIZE
             
-            if width > self.MAX_FRAME_WIDTH_RESIZE:
-                scale = self.MAX_FRAME_WIDTH_RESIZE / width
-                new_width = self.MAX_FRAME_WIDTH_RESIZE
+            if width > max_width:
+                scale = max_width / width
+                new_width = max_width
                 new_height = int(height * scale)
                 frame = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_AREA)
 
-            lab = cv2.cvtColor(frame, cv2.COLOR_BGR2LAB)
-            l, a, b = cv2.split(lab)
-            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-            l = clahe.apply(l)
-            enhanced_frame = cv2.merge([l, a, b])
-            enhanced_frame = cv2.cvtColor(enhanced_frame, cv2.COLOR_LAB2BGR)
-
-            return enhanced_frame
+            return self.enhance_frame(frame)
         except Exception as e:
             logging.error(f"Error during frame preprocessing: {e}")
             return frame
 
-    def detect_and_read_plate(self, frame: np.ndarray) -> dict:
+    def enhance_frame(self, frame: np.ndarray) -> np.ndarray:
+        # skipped / LUT for well exposed frames, CLAHE only when needed (see function/enhance.py)
+        return enhance.enhance(frame, clip_limit=self.CLAHE_CLIP_LIMIT, tile_grid=self.CLAHE_TILE_GRID)
+
+    def detect_and_read_plate(self, frame: np.ndarray, profile=None) -> dict:
         if not self.models_loaded:
             return {'success': False, 'plates': [], 'error': "Models not loaded"}
 
         if frame is None or frame.size == 0:
             return {'success': False, 'plates': [], 'error': "Input frame is empty"}
 
-        with self.processing_lock:
-            try:
-                with warnings.catch_warnings():
-                    warnings.simplefilter("ignore")
-                    
-                    processed_frame = self.preprocess_frame(frame)
-                    frame_hash = hash(processed_frame.tobytes())
-
-                    plates_data = self.yolo_LP_detect(processed_frame, size=640)
-                    detections = plates_data.xyxy[0].cpu().numpy()
-                
-                if detections.size == 0:
-                    return {'success': False, 'plates': [], 'error': "No license plates detected"}
-
-                detected_plates = []
-                plates_with_area = [(plate, (plate[2] - plate[0]) * (plate[3] - plate[1])) 
-                                  for plate in detections 
-                                  if (plate[2] - plate[0]) * (plate[3] - plate[1]) > self.MIN_AREA_THRESHOLD]
-                
-                plates_with_area.sort(key=lambda x: x[1], reverse=True)
-                
-                for plate, area in plates_with_area[:2]:
-                    x1, y1, x2, y2, conf, cls = plate
-                    x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
-
-                    if x2 <= x1 or y2 <= y1:
-                        continue
-
-                    cache_key = f"{frame_hash}_{x1}_{y1}_{x2}_{y2}"
-                    if cache_key in self.plate_cache:
-                        cached_result, timestamp = self.plate_cache[cache_key]
-                        if time.time() - timestamp < self.CACHE_TIMEOUT:
-                            detected_plates.append({
-                                'bbox': (x1, y1, x2, y2),
-                                'text': cached_result,
-                                'confidence': float(conf),
-                                'cached': True
-                            })
-                            continue
-
-                    x1_crop = max(0, x1 - self.PLATE_CROP_PADDING)
-                    y1_crop = max(0, y1 - self.PLATE_CROP_PADDING)
-                    x2_crop = min(processed_frame.shape[1], x2 + self.PLATE_CROP_PADDING)
-                    y2_crop = min(processed_frame.shape[0], y2 + self.PLATE_CROP_PADDING)
-
-                    crop_img = processed_frame[y1_crop:y2_crop, x1_crop:x2_crop]
-
-                    if crop_img.size == 0:
-                        continue
-
-                    plate_text = self.read_plate_optimized(crop_img)
-
-                    if plate_text and plate_text != "unknown" and len(plate_text) > 3:
-                        self.plate_cache[cache_key] = (plate_text, time.time())
-                        detected_plates.append({
-                            'bbox': (x1, y1, x2, y2),
-                            'text': plate_text,
-                            'confidence': float(conf),
-                            'cropped_image': crop_img,
-                            'cached': False
-                        })
-
-                detected_plates.sort(key=lambda x: x['confidence'], reverse=True)
-                return {'success': len(detected_plates) > 0, 'plates': detected_plates, 'error': None}
-
-            except Exception as e:
-                logging.error(f"Error during detection: {e}")
-                return {'success': False, 'plates': [], 'error': str(e)}
-
-    def read_plate_optimized(self, crop_img: np.ndarray) -> str:
-        if crop_img is None or crop_img.size == 0:
-            return "unknown"
-
+        # each call borrows one detector/OCR replica; waiting for a free replica is timed separately
+        wait_start = time.perf_counter()
+        replica = self.replica_pool.get()
+        acquired = time.perf_counter()
         try:
-            if self.yolo_license_plate and helper:
-                height, width = crop_img.shape[:2]
-                if width < self.MIN_PLATE_WIDTH_OCR:
-                    scale = self.MIN_PLATE_WIDTH_OCR / width
-                    new_width = self.MIN_PLATE_WIDTH_OCR
-                    new_height = int(height * scale)
-                    crop_img = cv2.resize(crop_img, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
-
-                plate_text = helper.read_plate(self.yolo_license_plate, crop_img)
-                if plate_text and plate_text != "unknown" and len(plate_text) > 3:
-                    return plate_text
-
-            return self.tesseract_ocr(crop_img)
+            with resource_governor.affinity('inference'):
+                result = self._detect_and_read(replica, frame, profile)
+        finally:
+            self.replica_pool.put(replica)
+        result.setdefault('timing', {}).update({
+            'replica': replica.index,
+            'queue_wait_ms': (acquired - wait_start) * 1000,
+            'inference_ms': (time.perf_counter() - acquired) * 1000,
+        })
+        return result
+
+    def _detect_and_read(self, replica: LPRReplica, frame: np.ndarray, profile=None) -> dict:
+        # all plate crops of the frame (car + trailer, two cars in view) share one OCR pass
+        return self._detect_and_read_batch(replica, [frame], [profile])[0]
+
+    def _detect_and_read_batch(self, replica: LPRReplica, frames: list, profiles: list | None = None) -> list:
+        # one detector pass over all frames per stage, then one OCR pass over every uncached crop
+        try:
+            profiles = profiles or [None] * len(frames)
+            # cached plates are only reused for the same camera
+            scopes = [self._cache_scope(profile) for profile in profiles]
+            profiles = [self.profiles.get(profile) for profile in profiles]
+            # only the camera's ROI is sent to the detector, OCR crops are cut from its full resolution pixels
+            rois = [profile.crop(frame) for frame, profile in zip(frames, profiles)]
+
+            detected_plates = [[] for _ in frames]
+            found = [False] * len(frames)
+            timings = {}
+            todo = list(range(len(frames)))
+            if self.prefilter is not None:
+                start = time.perf_counter()
+                todo = [i for i in todo if self.prefilter.check(rois[i][0])]
+                timings['prefilter_ms'] = (time.perf_counter() - start) * 1000
+            prefiltered = set(range(len(frames))) - set(todo)
+            fallbacks = [[] for _ in frames]
+            if todo and self.cascade:
+                # fast path: small input, no enhancement, plain OCR - enough for most daylight cars
+                self._run_stage('fast', replica, rois, profiles, todo, detected_plates, found, timings, scopes,
+                                fallbacks)
+                todo = [i for i in todo if not detected_plates[i]]
+            if todo:
+                self._run_stage('enhanced', replica, rois, profiles, todo, detected_plates, found, timings, scopes)
+                self._use_fallbacks(detected_plates, fallbacks)
+
+            # per batch timing: every frame of a batch shares the passes
+            return [self._frame_result(plates, has_plate, offset, i in prefiltered, timings)
+                    for i, ((_, offset), plates, has_plate) in enumerate(zip(rois, detected_plates, found))]
 
         except Exception as e:
-            logging.error(f"Error in OCR: {e}")
+            logging.error(f"Error during batch detection: {e}")
+            return [{'success': False, 'plates': [], 'error': str(e)} for _ in frames]
+
+    @staticmethod
+    def _cache_scope(profile):
+        # camera name the caller passed ("in_gate1"), the resolved profile may be shared by several cameras
+        return getattr(profile, 'name', profile)
+
+    def _frame_result(self, plates: list, has_plate: bool, offset: tuple, prefiltered: bool, timings: dict) -> dict:
+        if not has_plate:
+            result = {'success': False, 'plates': [], 'error': "No license plates detected"}
+            if prefiltered:
+                result['prefiltered'] = True
+        else:
+            self._to_frame_coords(plates, offset)
+            result = self._build_result(plates)
+        result['timing'] = dict(timings)
+        return result
+
+    def _run_stage(self, stage: str, replica: LPRReplica, rois: list, profiles: list, indices: list,
+                   detected_plates: list, found: list, timings: dict | None = None, scopes: list | None = None,
+                   fallbacks: list | None = None):
+        start = time.perf_counter()
+        pending = self._stage_candidates(stage, replica, rois, profiles, indices, detected_plates, found, scopes)
+        detected = time.perf_counter()
+        self._read_candidates(stage, replica, pending, detected_plates, fallbacks)
+
+        if timings is not None:
+            timings[f'{stage}_detect_ms'] = (detected - start) * 1000
+            timings[f'{stage}_ocr_ms'] = (time.perf_counter() - detected) * 1000
+
+    def _stage_candidates(self, stage: str, replica: LPRReplica, rois: list, profiles: list, indices: list,
+                          detected_plates: list, found: list, scopes: list | None = None) -> list:
+        # detector half of a stage: cached plates go straight to detected_plates, (i, candidate) to OCR are returned
+        fast = stage == 'fast'
+        scopes = scopes or [None] * len(rois)
+        all_detections = self._detect(replica, [rois[i][0] for i in indices], [profiles[i] for i in indices], fast)
+
+        pending = []
+        for i, detections in zip(indices, all_detections):
+            if detections.size == 0:
+                continue
+            found[i] = True
+            for candidate in self._plate_candidates(rois[i][0], detections, profiles[i].min_area, scopes[i]):
+                if candidate['cached']:
+                    candidate['stage'] = 'cache'
+                    detected_plates[i].append(candidate)
+                elif not fast or candidate['confidence'] >= self.CASCADE_DETECT_CONF:
+                    pending.append((i, candidate))
+        return pending
+
+    def _read_candidates(self, stage: str, replica: LPRReplica, pending: list, detected_plates: list,
+                         fallbacks: list | None = None):
+        # OCR half of a stage, only needs the replica's OCR model
+        if not pending:
+            return
+        fast = stage == 'fast'
+        crops = [candidate['cropped_image'] for _, candidate in pending]
+        with replica.ocr_lock:
+            if fast:
+                # only a confident box read as a plausible plate with no weak character ends the cascade here
+                accept = self._is_confident
+                readings = self._ocr_cascade(replica.ocr, crops, ('ocr',), accept)
+            elif self.cascade:
+                accept = self._is_plausible
+                readings = self._ocr_cascade(replica.ocr, crops, self.OCR_STAGES, accept)
+            else:
+                accept = self._is_valid_text
+                readings = self._ocr_cascade(replica.ocr, crops, ('ocr', 'tesseract'), accept)
+
+        for (i, candidate), (plate_text, ocr_stage, char_conf) in zip(pending, readings):
+            if not self._is_valid_text(plate_text):
+                continue
+            if fast and not accept(plate_text, char_conf):
+                # not confident enough to end the cascade, used if the enhanced stage reads nothing
+                if fallbacks is not None:
+                    fallbacks[i].append((candidate, plate_text))
+                continue
+            candidate['stage'] = stage if ocr_stage == 'ocr' else ocr_stage
+            detected_plates[i].append(self._accept_candidate(candidate, plate_text))
+
+    def _use_fallbacks(self, detected_plates: list, fallbacks: list):
+        for plates, readings in zip(detected_plates, fallbacks):
+            if plates:
+                continue
+            for candidate, plate_text in readings:
+                candidate['stage'] = 'fast'
+                plates.append(self._accept_candidate(candidate, plate_text))
+
+    def _detect(self, replica: LPRReplica, rois: list, profiles: list, fast: bool = False) -> list:
+        # frames sharing input size and threshold go through the detector together
+        groups = {}
+        for i, profile in enumerate(profiles):
+            size = min(self.CASCADE_FAST_SIZE, profile.input_size) if fast else profile.input_size
+            groups.setdefault((size, profile.detector_conf), []).append(i)
+
+        detections = [None] * len(rois)
+        for (size, conf), indices in groups.items():
+            if replica.detector_conf is not None:
+                replica.detector.conf = conf if conf is not None else replica.detector_conf
+            # raw pixels are resized once into the replica's input buffer and enhanced at detector resolution
+            x, shape1, shape0 = replica.letterbox.load([rois[i] for i in indices], size, replica.detector.stride,
+                                                       enhance=None if fast else self.enhance_frame)
+            for j, det in enumerate(replica.detector.detect_letterboxed(x)):
+                scale_boxes(shape1, det[:, :4], shape0[j])
+                detections[indices[j]] = det
+        return detections
+
+    @staticmethod
+    def _to_frame_coords(plates: list, offset: tuple):
+        # bboxes are found in the ROI, report them in the caller's frame
+        x0, y0 = offset
+        for plate in plates:
+            x1, y1, x2, y2 = plate['bbox']
+            plate['bbox'] = (x1 + x0, y1 + y0, x2 + x0, y2 + y0)
+
+    def _plate_candidates(self, frame: np.ndarray, detections: np.ndarray, min_area: float | None = None,
+                          scope=None) -> list:
+        min_area = self.MIN_AREA_THRESHOLD if min_area is None else min_area
+        plates_with_area = [(plate, (plate[2] - plate[0]) * (plate[3] - plate[1]))
+                            for plate in detections
+                            if (plate[2] - plate[0]) * (plate[3] - plate[1]) > min_area]
+        plates_with_area.sort(key=lambda x: x[1], reverse=True)
+
+        candidates = []
+        for plate, area in plates_with_area[:2]:
+            x1, y1, x2, y2, conf, cls = plate
+            x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
+
+            if x2 <= x1 or y2 <= y1:
+                continue
+
+            crop_img = self.crop_plate(frame, (x1, y1, x2, y2))
+
+            if crop_img.size == 0:
+                continue
+
+            # same car still at the barrier of the same camera -> same box and fingerprint, skip OCR
+            key = cache_key(scope, (x1, y1, x2, y2), crop_img)
+            cached_result = self.plate_cache.get(key)
+            if cached_result is not None:
+                candidates.append({
+                    'bbox': (x1, y1, x2, y2),
+                    'text': cached_result,
+                    'confidence': float(conf),
+                    'cached': True
+                })
+                continue
+
+            candidates.append({
+                'bbox': (x1, y1, x2, y2),
+                'confidence': float(conf),
+                'cropped_image': crop_img,
+                'cached': False,
+                'cache_key': key
+            })
+        return candidates
+
+    def crop_plate(self, frame: np.ndarray, box) -> np.ndarray:
+        """Padded plate crop (a view of frame) for a detector box in frame coordinates"""
+        x1, y1, x2, y2 = (int(v) for v in box[:4])
+        pad = self.PLATE_CROP_PADDING
+        return frame[max(0, y1 - pad):min(frame.shape[0], y2 + pad), max(0, x1 - pad):min(frame.shape[1], x2 + pad)]
+
+    def detect_plates(self, frame: np.ndarray, profile=None, fast: bool = False) -> np.ndarray:
+        """Detector only: (k, 6) [x1, y1, x2, y2, conf, cls] plate boxes in frame coordinates, no OCR"""
+        if not self.models_loaded or frame is None or frame.size == 0:
+            return np.zeros((0, 6), dtype=np.float32)
+        profile = self.profiles.get(profile)
+        roi, (x_offset, y_offset) = profile.crop(frame)
+        if self.prefilter is not None and not self.prefilter.check(roi):
+            return np.zeros((0, 6), dtype=np.float32)
+        replica = self.replica_pool.get()
+        try:
+            with resource_governor.affinity('inference'):
+                detections = self._detect(replica, [roi], [profile], fast)[0]
+        finally:
+            self.replica_pool.put(replica)
+        detections[:, [0, 2]] += x_offset
+        detections[:, [1, 3]] += y_offset
+        areas = (detections[:, 2] - detections[:, 0]) * (detections[:, 3] - detections[:, 1])
+        return detections[areas > profile.min_area]
+
+    def _accept_candidate(self, candidate: dict, plate_text: str) -> dict:
+        self.plate_cache.put(candidate.pop('cache_key'), plate_text)
+        candidate['text'] = plate_text
+        return candidate
+
+    @staticmethod
+    def _build_result(detected_plates: list) -> dict:
+        detected_plates.sort(key=lambda x: x['confidence'], reverse=True)
+        return {'success': len(detected_plates) > 0, 'plates': detected_plates, 'error': None,
+                'stage': detected_plates[0].get('stage') if detected_plates else None}
+
+    @staticmethod
+    def _is_valid_text(plate_text: str, char_conf: float | None = None) -> bool:
+        return bool(plate_text) and plate_text != "unknown" and len(plate_text) > 3
+
+    @classmethod
+    def _is_plausible(cls, plate_text: str, char_conf: float | None = None) -> bool:
+        if helper is None:
+            return cls._is_valid_text(plate_text)
+        return helper.is_plausible_plate(plate_text)
+
+    @classmethod
+    def _is_confident(cls, plate_text: str, char_conf: float | None = None) -> bool:
+        return cls._is_plausible(plate_text) and char_conf is not None and char_conf >= cls.CASCADE_OCR_CONF
+
+    def _upscale_for_ocr(self, crop_img: np.ndarray) -> np.ndarray:
+        height, width = crop_img.shape[:2]
+        if width < self.MIN_PLATE_WIDTH_OCR:
+            scale = self.MIN_PLATE_WIDTH_OCR / width
+            new_width = self.MIN_PLATE_WIDTH_OCR
+            new_height = int(height * scale)
+            crop_img = cv2.resize(crop_img, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+        return crop_img
+
+    def read_plate_optimized(self, crop_img: np.ndarray, ocr_model=None) -> str:
+        if crop_img is None or crop_img.size == 0:
             return "unknown"
 
-    def tesseract_ocr(self, crop_img: np.ndarray) -> str:
-        if not TESSERACT_AVAILABLE or crop_img is None or crop_img.size == 0:
-            return "unknown"
+        return self.read_plates_batch([crop_img], ocr_model)[0]
+
+    def read_plates_batch(self, crops: list, ocr_model=None, stages=('ocr', 'tesseract')) -> list:
+        if ocr_model is None:
+            # borrow a replica like detect_and_read_plate, the OCR model of a busy replica is not shared
+            replica = self.replica_pool.get()
+            try:
+                with resource_governor.affinity('inference'), replica.ocr_lock:
+                    return self.read_plates_batch(crops, replica.ocr, stages)
+            finally:
+                self.replica_pool.put(replica)
+        return [plate_text for plate_text, _, _ in
+                self._ocr_cascade(ocr_model, crops, stages, self._is_valid_text)]
+
+    def _ocr_cascade(self, ocr_model, crops: list, stages: tuple, accept) -> list:
+        # each stage only sees the crops no earlier stage could read; returns (text, stage, char_conf)
+        # per crop, the accepted reading or else the first valid one
+        readings = [("unknown", None, None)] * len(crops)
+        crops = [self._upscale_for_ocr(crop_img) for crop_img in crops]
+        todo = list(range(len(crops)))
+
+        # tesseract starts next to the YOLO stages instead of after them, the first accepted reading wins
+        racing = {}
+        if 'tesseract' in stages and self.tesseract_pool is not None:
+            racing = {k: self.tesseract_pool.submit(crops[k]) for k in todo}
+
+        def record(k, plate_text, stage, char_conf):
+            accepted = accept(plate_text, char_conf)
+            if accepted or (readings[k][1] is None and self._is_valid_text(plate_text)):
+                readings[k] = (plate_text, stage, char_conf)
+            return accepted
 
         try:
-            gray = cv2.cvtColor(crop_img, cv2.COLOR_BGR2GRAY)
-            _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-            
-            custom_config = r'--oem 3 --psm 8 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
-            text = pytesseract.image_to_string(thresh, config=custom_config).strip()
-            
-            if len(text) >= 4 and text.replace(' ', '').isalnum():
-                return text.replace(' ', '').upper()
-            
-            return "unknown"
+            for stage in stages:
+                if not todo:
+                    break
+                if stage == 'tesseract' and racing:
+                    texts = [(self.tesseract_pool.result(racing.pop(k)) if k in racing else "unknown", None)
+                             for k in todo]
+                else:
+                    try:
+                        texts = self._ocr_stage(stage, ocr_model, [crops[k] for k in todo], accept)
+                    except Exception as e:
+                        # a failing stage is skipped, the next one still gets the crops
+                        logging.error(f"Error in OCR stage {stage}: {e}")
+                        continue
+                todo = [k for k, (plate_text, char_conf) in zip(todo, texts)
+                        if not record(k, plate_text, stage, char_conf)]
+
+                # crops tesseract already finished do not wait for the remaining YOLO stages
+                for k in [k for k in todo if k in racing and racing[k].done()]:
+                    if record(k, self.tesseract_pool.result(racing.pop(k)), 'tesseract', None):
+                        todo.remove(k)
+            return readings
+        finally:
+            # crops read by YOLO first: drop their tesseract requests
+            for future in racing.values():
+                self.tesseract_pool.cancel(future)
+
+    def _ocr_stage(self, stage: str, ocr_model, crops: list, accept) -> list:
+        # (text, weakest character confidence) per crop, confidence is None for tesseract
+        if stage == 'tesseract':
+            return [(self.tesseract_ocr(crop_img), None) for crop_img in crops]
+        if not (ocr_model and helper):
+            return [("unknown", None)] * len(crops)
+        if stage == 'deskew':
+            readings = [("unknown", None)] * len(crops)
+            if utils_rotate is None:
+                return readings
+            # only crops that are actually rotated get a second OCR pass
+            angles = [utils_rotate.compute_skew(utils_rotate.changeContrast(crop_img), 0) for crop_img in crops]
+            rotated = [k for k, angle in enumerate(angles) if abs(angle) >= self.DESKEW_MIN_ANGLE]
+            if rotated:
+                texts = helper.read_plates(ocr_model, [utils_rotate.rotate_image(crops[k], angles[k]) for k in rotated],
+                                           with_conf=True)
+                for k, reading in zip(rotated, texts):
+                    readings[k] = reading
+            return readings
+        if stage == 'multiscale':
+            # every crop at every scale in one batch, first accepted scale wins
+            scaled = [cv2.resize(crop_img, None, fx=f, fy=f, interpolation=cv2.INTER_CUBIC)
+                      for crop_img in crops for f in self.MULTISCALE_FACTORS]
+            readings = helper.read_plates(ocr_model, scaled, with_conf=True)
+            per_crop = len(self.MULTISCALE_FACTORS)
+            results = []
+            for k in range(len(crops)):
+                options = readings[k * per_crop:(k + 1) * per_crop]
+                results.append(next((r for r in options if accept(*r)), options[0]))
+            return results
+        return helper.read_plates(ocr_model, crops, with_conf=True)
 
-        except Exception:
+    def tesseract_ocr(self, crop_img: np.ndarray) -> str:
+        if self.tesseract_pool is None or crop_img is None or crop_img.size == 0:
             return "unknown"
+        return self.tesseract_pool.recognize(crop_img)
 
     def process_image_file(self, image_path: str) -> dict:
         if not os.path.exists(image_path):
@@ -247,7 +730,20 @@ class OptimizedLPR:
         return detection_result['plates'][0]
 
     def is_ready(self) -> bool:
-        return self.models_loaded
+        return self.models_loaded and all(self.stages_ready.values())
 
     def clear_cache(self):
-        self.plate_cache.clear()
\ No newline at end of file
+        self.plate_cache.clear()
+
+    def get_cache_stats(self) -> dict:
+        return self.plate_cache.stats()
+
+    def get_enhance_stats(self) -> dict:
+        return enhance.stats()
+
+    def get_prefilter_stats(self) -> dict | None:
+        return self.prefilter.stats() if self.prefilter is not None else None
+
+    def shutdown(self):
+        if self.tesseract_pool is not None:
+            self.tesseract_pool.shutdown()
\ No newline at end of file
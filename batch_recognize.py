@@ -0,0 +1,221 @@
+"""
+BATCH_RECOGNIZE.PY - Nhận diện lại hàng loạt ảnh lưu trữ (offline, tận dụng hết core của máy)
+Chia ảnh trong cây thư mục cho nhiều process, mỗi process giữ 1 model OptimizedLPR riêng,
+kết quả ghi dần ra CSV hoặc Parquet. Chạy lại cùng lệnh thì bỏ qua ảnh đã có trong file kết quả.
+  - CSV:     results.csv, mỗi ảnh 1 dòng, ghi ngay khi có kết quả
+  - Parquet: results.parquet/ là thư mục part-*.parquet (cần pandas + pyarrow), mỗi part 1 lô ảnh
+
+Cách dùng:
+    python batch_recognize.py img_in_gate1 img_out_gate1 --output results.csv
+    python batch_recognize.py /data/archive --output archive.parquet --workers 8 --backend onnx
+    python batch_recognize.py /data/archive --output results.csv --no-resume
+"""
+import argparse
+import csv
+import glob
+import logging
+import multiprocessing
+import os
+import time
+
+import cv2
+
+from function.lpr_corpus import IMAGE_EXTENSIONS, parse_label, is_correct
+
+logger = logging.getLogger('XParking.Batch')
+
+COLUMNS = ['image', 'label', 'plate', 'confidence', 'stage', 'plates', 'correct', 'ms', 'error']
+PARQUET_PART_SIZE = 1000
+
+LOAD_ERROR = "Could not load LPR models"
+
+_lpr = None
+
+def _init_worker(config):
+    # an exception here would make the pool start a new worker forever, the failure is reported per image
+    global _lpr
+    from function import resource_governor
+    from QUET_BSX import OptimizedLPR
+    logging.getLogger().setLevel(logging.WARNING)
+    try:
+        resource_governor.configure(config)
+        lpr = OptimizedLPR(config)
+        _lpr = lpr if lpr.load_models() else None
+    except Exception as e:
+        logging.error(f"{LOAD_ERROR}: {e}")
+
+def _recognize(path):
+    record = dict.fromkeys(COLUMNS)
+    record.update(image=path, label=parse_label(path), plates=0)
+    if _lpr is None:
+        record['error'] = LOAD_ERROR
+        return record
+    start = time.perf_counter()
+    try:
+        frame = cv2.imread(path)
+        if frame is None:
+            record['error'] = "Could not load image"
+            return record
+        _lpr.clear_cache()
+        result = _lpr.detect_and_read_plate(frame)
+        best = _lpr.get_best_plate(result)
+        record.update(plates=len(result['plates']), stage=result.get('stage'), error=result.get('error'))
+        if best:
+            record.update(plate=best['text'], confidence=round(float(best['confidence']), 4))
+        if record['label']:
+            record['correct'] = is_correct(record['plate'], record['label'])
+    except Exception as e:
+        record['error'] = str(e)
+    record['ms'] = round((time.perf_counter() - start) * 1000, 1)
+    return record
+
+def find_images(roots) -> list:
+    paths = []
+    for root in roots:
+        if os.path.isfile(root):
+            paths.append(root)
+            continue
+        for path in glob.iglob(os.path.join(root, '**', '*'), recursive=True):
+            if path.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(path)
+    return sorted(set(paths))
+
+class CsvSink:
+    def __init__(self, path, resume=True):
+        self.path = path
+        if not resume and os.path.exists(path):
+            os.remove(path)
+        self._drop_partial_line()
+        self.file = open(path, 'a', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.file, fieldnames=COLUMNS)
+        if self.file.tell() == 0:
+            self.writer.writeheader()
+
+    def _drop_partial_line(self):
+        # a run killed mid-write leaves an incomplete last row, cut it so the image is redone
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            if data and not data.endswith(b'\n'):
+                f.truncate(data.rfind(b'\n') + 1)
+
+    def done(self) -> set:
+        if not os.path.exists(self.path):
+            return set()
+        with open(self.path, newline='', encoding='utf-8') as f:
+            return {row['image'] for row in csv.DictReader(f)}
+
+    def write(self, record):
+        self.writer.writerow(record)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+class ParquetSink:
+    def __init__(self, path, resume=True):
+        import pandas as pd
+        # raises ImportError now, not at the first flush after the whole batch has run
+        pd.io.parquet.get_engine('auto')
+        self.pd = pd
+        self.path = path
+        if not resume:
+            for part in glob.glob(os.path.join(path, 'part-*.parquet')):
+                os.remove(part)
+        os.makedirs(path, exist_ok=True)
+        self.rows = []
+        self.next_part = len(glob.glob(os.path.join(path, 'part-*.parquet')))
+
+    def done(self) -> set:
+        images = set()
+        for part in glob.glob(os.path.join(self.path, 'part-*.parquet')):
+            images.update(self.pd.read_parquet(part, columns=['image'])['image'])
+        return images
+
+    def write(self, record):
+        self.rows.append(record)
+        if len(self.rows) >= PARQUET_PART_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        # written to a temp name first, a part file is either complete or absent
+        part = os.path.join(self.path, f'part-{self.next_part:05d}.parquet')
+        frame = self.pd.DataFrame(self.rows, columns=COLUMNS).astype({'correct': 'boolean'})
+        frame.to_parquet(part + '.tmp', index=False)
+        os.replace(part + '.tmp', part)
+        self.next_part += 1
+        self.rows = []
+
+    def close(self):
+        self.flush()
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline batch re-recognition of archived gate images")
+    parser.add_argument('roots', nargs='+', help="image directories (searched recursively) or files")
+    parser.add_argument('--output', default='results.csv', help="*.csv or *.parquet")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument('--threads', type=int, default=1, help="inference threads per worker")
+    parser.add_argument('--backend', default='auto', choices=['auto', 'torchscript', 'onnx', 'torch'])
+    parser.add_argument('--precision', default='fp32', choices=['fp32', 'int8'])
+    parser.add_argument('--no-cascade', action='store_true')
+    parser.add_argument('--no-resume', action='store_true', help="start over instead of skipping done images")
+    parser.add_argument('--chunksize', type=int, default=8, help="images handed to a worker at a time")
+    args = parser.parse_args()
+
+    sink_type = ParquetSink if args.output.endswith('.parquet') else CsvSink
+    try:
+        sink = sink_type(args.output, resume=not args.no_resume)
+    except ImportError:
+        logger.error("Parquet output needs pandas and pyarrow, use a .csv output instead")
+        return 1
+
+    done = sink.done()
+    images = [path for path in find_images(args.roots) if path not in done]
+    logger.info(f"{len(images)} image(s) to process, {len(done)} already in {args.output}, "
+                f"{args.workers} worker(s) x {args.threads} thread(s)")
+    if not images:
+        sink.close()
+        return 0
+
+    # one model per process, each process gets its own slice of the cores
+    config = {'lpr_backend': args.backend, 'lpr_precision': args.precision, 'lpr_cascade': not args.no_cascade,
+              'lpr_replicas': 1, 'lpr_threads_per_replica': args.threads, 'cpu_inference_threads': args.threads,
+              'lpr_cache_size': 0, 'lpr_tesseract_workers': 1}
+    start = time.perf_counter()
+    processed = correct = labelled = 0
+    failed = False
+    try:
+        with multiprocessing.Pool(args.workers, initializer=_init_worker, initargs=(config,)) as pool:
+            for record in pool.imap_unordered(_recognize, images, chunksize=args.chunksize):
+                if record['error'] == LOAD_ERROR:
+                    # not written: the image has to be processed again when the models are fixed
+                    logger.error(f"{LOAD_ERROR} ({args.backend} {args.precision}), stopping")
+                    failed = True
+                    break
+                sink.write(record)
+                processed += 1
+                if record['correct'] is not None:
+                    labelled += 1
+                    correct += record['correct']
+                if processed % 100 == 0 or processed == len(images):
+                    rate = processed / (time.perf_counter() - start)
+                    logger.info(f"{processed}/{len(images)} images, {rate:.1f} img/s, "
+                                f"ETA {(len(images) - processed) / rate:.0f}s")
+    except KeyboardInterrupt:
+        logger.warning("Interrupted, finished images are saved - run the same command again to resume")
+    finally:
+        sink.close()
+
+    if failed:
+        return 1
+    elapsed = time.perf_counter() - start
+    logger.info(f"Done: {processed} image(s) in {elapsed:.1f}s ({processed / max(elapsed, 1e-9):.1f} img/s)"
+                + (f", accuracy {correct / labelled:.1%} on {labelled} labelled" if labelled else ""))
+    return 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s | %(message)s', datefmt='%H:%M:%S')
+    raise SystemExit(main())
@@ -0,0 +1,215 @@
+"""
+BENCHMARK_LPR.PY - Đo độ chính xác và độ trễ nhận diện biển số trên bộ ảnh đã lưu
+Ảnh lấy từ img_in_gate1/, img_out_gate1/ (tên file = biển số), kết quả ghi ra JSON để so sánh
+backend, ngưỡng, model trước khi đưa lên máy cổng:
+  - độ trễ p50/p95/p99 của cả lần nhận diện và từng bước (detect / OCR của lượt fast, enhanced)
+  - tỉ lệ đọc đúng chính xác biển số, theo từng stage đã chốt kết quả (fast, enhanced, deskew, ...)
+  - ngưỡng lpr_prefilter_threshold chỉ bỏ sót tối đa --prefilter-budget ảnh có biển số
+
+Cách dùng:
+    python benchmark_lpr.py
+    python benchmark_lpr.py --backend onnx --precision int8 --label int8 --output bench_int8.json
+    python benchmark_lpr.py --detector-conf 0.5 --no-cascade --compare bench_int8.json
+    python benchmark_lpr.py --prefilter --prefilter-budget 0.005
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import cv2
+
+from QUET_BSX import OptimizedLPR
+from function.lpr_corpus import CORPUS_DIRS, load_corpus, is_correct, latency_summary
+from function.plate_prefilter import plate_score, calibrate
+
+logger = logging.getLogger('XParking.Benchmark')
+
+SUMMARY_KEYS = ('accuracy', 'detection_rate')
+LATENCY_KEYS = ('p50_ms', 'p95_ms', 'p99_ms')
+
+def build_config(args) -> dict:
+    config = {'lpr_backend': args.backend, 'lpr_precision': args.precision, 'lpr_cascade': not args.no_cascade,
+              'lpr_replicas': 1, 'lpr_threads_per_replica': args.threads, 'lpr_cache_size': 0,
+              'lpr_prefilter': args.prefilter}
+    if args.prefilter_threshold is not None:
+        config['lpr_prefilter_threshold'] = args.prefilter_threshold
+    default_profile = {}
+    if args.detector_conf is not None:
+        default_profile['detector_conf'] = args.detector_conf
+    if args.input_size:
+        default_profile['input_size'] = args.input_size
+    if default_profile:
+        config['lpr_profiles'] = {'default': default_profile}
+    return config
+
+def model_files(lpr: OptimizedLPR) -> dict:
+    # size + mtime identify the model version that was measured
+    files = {}
+    for path in (lpr.LP_DETECTOR_MODEL_PATH, lpr.OCR_MODEL_PATH, lpr.LP_DETECTOR_ONNX_PATH, lpr.OCR_ONNX_PATH,
+                 lpr.LP_DETECTOR_TS_PATH, lpr.OCR_TS_PATH, lpr.int8_path(lpr.LP_DETECTOR_ONNX_PATH),
+                 lpr.int8_path(lpr.OCR_ONNX_PATH)):
+        if os.path.exists(path):
+            stat = os.stat(path)
+            files[path] = {'size': stat.st_size,
+                           'modified': datetime.fromtimestamp(stat.st_mtime).isoformat(timespec='seconds')}
+    return files
+
+def run(lpr: OptimizedLPR, samples: list, warmup: int) -> list:
+    for path, _ in samples[:warmup]:
+        frame = cv2.imread(path)
+        if frame is not None:
+            lpr.detect_and_read_plate(frame)
+
+    records = []
+    for path, label in samples:
+        start = time.perf_counter()
+        frame = cv2.imread(path)
+        loaded = time.perf_counter()
+        if frame is None:
+            logger.warning(f"Could not load image: {path}")
+            continue
+        lpr.clear_cache()
+        result = lpr.detect_and_read_plate(frame)
+        done = time.perf_counter()
+        best = lpr.get_best_plate(result)
+        text = best['text'] if best else None
+        # scored outside the timed call, also when the prefilter is off, to calibrate its threshold
+        score = plate_score(lpr.profiles.get(None).crop(frame)[0])
+        records.append({
+            'image': path,
+            'label': label,
+            'read': text,
+            'correct': is_correct(text, label),
+            'stage': result.get('stage'),
+            'prefiltered': result.get('prefiltered', False),
+            'prefilter_score': score,
+            'imread_ms': (loaded - start) * 1000,
+            'total_ms': (done - loaded) * 1000,
+            **{key: value for key, value in result.get('timing', {}).items() if key.endswith('_ms')},
+        })
+    return records
+
+def summarize(records: list, prefilter_budget: float = 0.01) -> dict:
+    total = len(records)
+    latency = defaultdict(list)
+    for record in records:
+        for key, value in record.items():
+            if key.endswith('_ms'):
+                latency[key[:-3]].append(value)
+    by_stage = defaultdict(list)
+    for record in records:
+        by_stage[record['stage'] or 'none'].append(record)
+    return {
+        'images': total,
+        'correct': sum(r['correct'] for r in records),
+        'accuracy': sum(r['correct'] for r in records) / total if total else 0.0,
+        'detection_rate': sum(r['read'] is not None for r in records) / total if total else 0.0,
+        'latency': {key: latency_summary(values) for key, values in sorted(latency.items())},
+        'stages': {stage: {'images': len(group),
+                           'accuracy': sum(r['correct'] for r in group) / len(group),
+                           'latency': latency_summary([r['total_ms'] for r in group])}
+                   for stage, group in sorted(by_stage.items())},
+        # corpus images are all plates: the detector hits give the miss budget, scores of the rest are shown
+        'prefilter': {'budget': prefilter_budget,
+                      'threshold': calibrate([r['prefilter_score'] for r in records if r['read'] is not None],
+                                             prefilter_budget),
+                      'prefiltered': sum(r['prefiltered'] for r in records),
+                      'score_p50': statistics.median(r['prefilter_score'] for r in records) if records else 0.0},
+    }
+
+def print_summary(report: dict, baseline: dict | None = None):
+    summary = report['summary']
+    base = baseline['summary'] if baseline else None
+
+    def delta(value, old, percent=False):
+        if old is None:
+            return ''
+        diff = value - old
+        return f"  ({diff * 100:+.1f} pts)" if percent else f"  ({diff:+.1f})"
+
+    print(f"\n{report['label']}: {summary['images']} images, backend {report['load'].get('backend')} "
+          f"{report['load'].get('precision')}, cascade {report['config']['lpr_cascade']}")
+    for key in SUMMARY_KEYS:
+        print(f"  {key:<16}{summary[key]:>8.1%}{delta(summary[key], base[key] if base else None, True)}")
+    print(f"\n  {'latency':<18}" + "".join(f"{key:>10}" for key in LATENCY_KEYS))
+    for name, stats in summary['latency'].items():
+        old = base['latency'].get(name) if base else None
+        print(f"  {name:<18}" + "".join(f"{stats[key]:>10.1f}" for key in LATENCY_KEYS)
+              + (delta(stats['p95_ms'], old['p95_ms']) + " p95" if old else ''))
+    print(f"\n  {'stage':<18}{'images':>10}{'accuracy':>10}{'p50_ms':>10}{'p95_ms':>10}")
+    for stage, stats in summary['stages'].items():
+        print(f"  {stage:<18}{stats['images']:>10}{stats['accuracy']:>10.1%}"
+              f"{stats['latency']['p50_ms']:>10.1f}{stats['latency']['p95_ms']:>10.1f}")
+    prefilter = summary['prefilter']
+    print(f"\n  prefilter threshold for a {prefilter['budget']:.1%} miss budget: {prefilter['threshold']:.3f} "
+          f"(score p50 {prefilter['score_p50']:.3f}, {prefilter['prefiltered']} images skipped this run)")
+
+def main():
+    parser = argparse.ArgumentParser(description="XParking LPR accuracy / latency benchmark")
+    parser.add_argument('--corpus', nargs='+', default=list(CORPUS_DIRS), help="image dirs or files")
+    parser.add_argument('--limit', type=int, help="max number of images")
+    parser.add_argument('--backend', default=OptimizedLPR.DEFAULT_BACKEND,
+                        choices=['auto', 'torchscript', 'onnx', 'torch'])
+    parser.add_argument('--precision', default=OptimizedLPR.DEFAULT_PRECISION, choices=OptimizedLPR.PRECISIONS)
+    parser.add_argument('--no-cascade', action='store_true', help="single full pass (lpr_cascade=False)")
+    parser.add_argument('--detector-conf', type=float, help="detector threshold for every image")
+    parser.add_argument('--input-size', type=int, help="detector input size")
+    parser.add_argument('--threads', type=int, help="inference threads (default: all cores)")
+    parser.add_argument('--prefilter', action='store_true', help="run with the plate prefilter (lpr_prefilter)")
+    parser.add_argument('--prefilter-threshold', type=float, help="prefilter threshold for this run")
+    parser.add_argument('--prefilter-budget', type=float, default=0.01,
+                        help="share of plate images the calibrated prefilter threshold may reject")
+    parser.add_argument('--warmup', type=int, default=3, help="images run once before measuring")
+    parser.add_argument('--label', help="name of this run in the report")
+    parser.add_argument('--output', help="JSON report path (default benchmark_<label>.json)")
+    parser.add_argument('--compare', help="previous JSON report to print differences against")
+    args = parser.parse_args()
+
+    samples = load_corpus(args.corpus, args.limit)
+    if not samples:
+        logger.error(f"No labelled images in {', '.join(args.corpus)}")
+        return 1
+
+    config = build_config(args)
+    lpr = OptimizedLPR(config)
+    if not lpr.load_models():
+        logger.error("Could not load LPR models")
+        return 1
+
+    label = args.label or f"{lpr.active_backend}-{lpr.active_precision}"
+    logger.info(f"Benchmark '{label}': {len(samples)} images")
+    records = run(lpr, samples, args.warmup)
+    report = {
+        'label': label,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'host': {'platform': platform.platform(), 'python': platform.python_version(),
+                 'cpu_count': os.cpu_count(), 'opencv': cv2.__version__},
+        'config': config,
+        'load': lpr.load_stats,
+        'models': model_files(lpr),
+        'corpus': args.corpus,
+        'summary': summarize(records, args.prefilter_budget),
+        'records': records,
+    }
+
+    output = args.output or f"benchmark_{label}.json"
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_summary(report, baseline)
+    logger.info(f"Report saved to {output}")
+    return 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s | %(message)s', datefmt='%H:%M:%S')
+    raise SystemExit(main())
@@ -10,6 +10,8 @@ from tkinter import ttk
 import cv2
 import logging
 from PIL import Image, ImageTk
+from function import resource_governor
+from function.frame_select import SharpFrameBuffer
 
 # Cấu hình timezone VN
 os.environ['TZ'] = 'Asia/Ho_Chi_Minh'
@@ -29,6 +31,51 @@ class SystemConfig:
             # Camera
             'camera_in_gate1': 0,
             'camera_in_gate2': 1, 
+            # LPR
+            'lpr_backend': 'auto',  # auto | torchscript | onnx | torch (torch.hub, cần mạng/cache)
+            'lpr_mmap_weights': False,  # torchscript: load weights bằng mmap
+            'lpr_precision': 'fp32',  # fp32 | int8 (onnx, model *.int8.onnx tạo bằng quantize_models.py)
+            'cpu_inference_threads': None,  # tổng số luồng cho AI, chia đều cho các replica (None = số core được dùng)
+            'torch_interop_threads': 1,
+            'cv_threads': None,  # luồng nội bộ OpenCV (None = bằng số luồng mỗi replica)
+            'cpu_inference_cores': None,  # vd [1, 2, 3]: AI chỉ chạy trên các core này (chỉ Linux)
+            'cpu_io_cores': None,  # vd [0]: camera, GUI, MQTT chạy trên core này (chỉ Linux)
+            'lpr_replicas': 2,  # số bản model chạy song song (các cổng không phải chờ nhau)
+            'lpr_threads_per_replica': None,  # None = số core / lpr_replicas
+            'lpr_batching': False,  # gom frame các cổng đến cùng lúc thành 1 batch
+            'lpr_batch_max_delay_ms': 5,  # thời gian chờ gom batch tối đa (chỉ khi đang cao điểm)
+            'lpr_batch_max_size': 4,
+            'lpr_pipeline': False,  # detector và OCR chạy ở 2 luồng riêng nối bằng hàng đợi (thay cho lpr_batching)
+            'lpr_pipeline_queue_size': 4,  # số frame tối đa chờ ở mỗi bước
+            'lpr_cache_size': 128,  # số biển số nhớ tạm (theo camera + vị trí + ảnh biển số)
+            'lpr_cache_ttl': 2.0,  # giây, xe đứng yên trước barrier không phải OCR lại (ngắn: xe sau đỗ đúng chỗ xe trước)
+            'lpr_cascade': True,  # thử nhanh trước (ảnh nhỏ, không tăng cường), chỉ khó mới chạy deskew/multiscale/tesseract
+            'lpr_tesseract_workers': 1,  # tesseract chạy song song với OCR YOLO (cần tesserocr hoặc pytesseract)
+            'lpr_tesseract_timeout': 1.0,  # giây, quá hạn thì bỏ kết quả tesseract
+            'lpr_burst_frames': 5,  # số frame tối đa mỗi lần nhận diện (1 = chỉ 1 frame như cũ)
+            'lpr_burst_agree': 2,  # dừng sớm khi đủ số frame đọc giống nhau
+            'lpr_burst_interval': 0.04,  # giây giữa 2 frame (camera ~30 FPS)
+            'lpr_continuous': False,  # chạy detector liên tục trên camera, theo dõi biển số, OCR mỗi xe vài lần
+            'lpr_continuous_interval': 0.2,  # giây giữa 2 lần detect
+            'lpr_continuous_max_ocr': 3,  # số lần OCR tối đa mỗi biển số được theo dõi
+            'lpr_continuous_hold': 0.6,  # giây, chỉ dùng biển số của lượt detect gần nhất mới hơn khoảng này
+            'lpr_motion_gate': False,  # có chuyển động trong ROI thì nhận diện trước, trigger IR đến thì dùng luôn
+            'lpr_motion_threshold': 25,  # mức thay đổi độ sáng tính là chuyển động
+            'lpr_motion_min_fraction': 0.01,  # tỉ lệ ROI phải thay đổi
+            'lpr_motion_frames': 3,  # số frame chuyển động liên tiếp
+            'lpr_speculative_window': 3.0,  # giây, kết quả nhận diện trước chỉ dùng trong khoảng này
+            'lpr_speculative_gate': 1,  # cổng (1/2) dùng kết quả nhận diện trước, 2 cổng dùng chung camera in/out
+            'lpr_sharp_frames': 8,  # số frame gần nhất giữ lại để chọn frame nét nhất (0 = lấy frame mới nhất)
+            'lpr_sharp_window': 0.3,  # giây, chỉ chọn trong các frame gần đây
+            'lpr_prefilter': False,  # bỏ qua detector với frame chắc chắn không có biển số (mật độ cạnh dọc)
+            'lpr_prefilter_threshold': 0.45,  # hiệu chỉnh theo ảnh thật: benchmark_lpr.py --prefilter-budget
+            # Profile LPR theo camera: "in_gate1", "out_gate2", ... (không có thì dùng "in"/"out", rồi "default")
+            # roi = [x1, y1, x2, y2] theo tỉ lệ khung hình, chỉ vùng này được đưa vào detector
+            # các trường: roi, input_size, detector_conf, min_area
+            'lpr_profiles': {
+                'default': {'roi': None, 'input_size': 640},
+            },
+            'lpr_profiles_file': 'lpr_profiles.json',  # ghi đè profile, sửa file là áp dụng ngay không cần restart
             # Parking
             'price_per_minute': 1000,
             'min_price': 5000,
@@ -80,6 +127,16 @@ class SystemConfig:
 class GUIManager:
     def __init__(self, system_config):
         self.config = system_config
+        self.motion_gates = {}  # camera_type -> (MotionGate, callback(camera_type, frame)), xem set_motion_gate
+        # vài frame gần nhất của mỗi camera kèm độ nét, capture_frame trả về frame nét nhất
+        history = int(system_config.config.get('lpr_sharp_frames', 8))
+        window = system_config.config.get('lpr_sharp_window', 0.3)
+        self.frame_buffers = ({camera_type: SharpFrameBuffer(history, window) for camera_type in ('in', 'out')}
+                              if history > 1 else {})
+
+    def set_motion_gate(self, camera_type, gate, callback):
+        """Gắn motion gate vào thread đọc camera: có chuyển động liên tục thì gọi callback(camera_type, frame)"""
+        self.motion_gates[camera_type] = (gate, callback)
 
     def init_gui(self, main_system):
         self.config.root = tk.Tk()
@@ -272,12 +329,20 @@ class GUIManager:
 
     def _camera_reader_thread(self, camera, camera_type, update_status_func):
         """Thread đọc frames từ camera"""
+        resource_governor.pin('io')
         while self.config.is_running and camera and camera.isOpened():
             try:
                 ret, frame = camera.read()
                 if ret:
                     # Resize cho hiển thị
                     frame = cv2.resize(frame, (400, 300))
+
+                    if camera_type in self.frame_buffers:
+                        self.frame_buffers[camera_type].add(frame)
+
+                    motion = self.motion_gates.get(camera_type)
+                    if motion and motion[0].update(frame):
+                        motion[1](camera_type, frame.copy())
                     
                     if camera_type == 'in':
                         with self.config.frame_lock_in:
@@ -330,9 +395,14 @@ class GUIManager:
         if self.config.is_running and self.config.root:
             self.config.root.after(30, self.update_camera_feeds)
     
-    def capture_frame(self, camera_type='in'):
-        """Capture frame từ camera"""
+    def capture_frame(self, camera_type='in', gate=1):
+        """Capture frame từ camera (gate: cổng gọi, 2 cổng đang dùng chung camera in/out)
+        - có lịch sử frame thì lấy frame nét nhất trong lpr_sharp_window giây gần nhất"""
         try:
+            buffer = self.frame_buffers.get(camera_type)
+            best = buffer.best() if buffer else None
+            if best is not None:
+                return best[0].copy()
             if camera_type == 'in':
                 with self.config.frame_lock_in:
                     return self.config.latest_frame_in.copy() if self.config.latest_frame_in is not None else None
@@ -342,6 +412,17 @@ class GUIManager:
         except:
             return None
     
+    def capture_newer_frame(self, camera_type='in', since=None, gate=1):
+        """Frame nét nhất mới hơn thời điểm since - trả về (frame hoặc None, timestamp)
+        dùng cho burst: mỗi lần đọc là 1 frame khác, không đếm trùng 1 frame"""
+        buffer = self.frame_buffers.get(camera_type)
+        if not buffer:
+            return self.capture_frame(camera_type, gate=gate), time.monotonic()
+        best = buffer.best(since=since)
+        if best is None:
+            return None, since
+        return best[0].copy(), best[1]
+
     def release_cameras(self):
         """Giải phóng cameras"""
         self.config.is_running = False
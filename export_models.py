@@ -0,0 +1,137 @@
+"""
+EXPORT_MODELS.PY - Xuất model YOLOv5 (.pt) sang ONNX / TorchScript
+torch.hub chỉ cần khi export; máy cổng load artifact trong model/ mà không cần mạng hay repo yolov5.
+  - onnx:        chạy bằng ONNX Runtime, không cần torch
+  - torchscript: chạy bằng torch.jit, kèm state dict (.weights) để load mmap
+
+Cách dùng:
+    python export_models.py
+    python export_models.py --format torchscript
+    python export_models.py --verify img_in_gate1/98K102897_20251204_140232.jpg
+"""
+import argparse
+import inspect
+import json
+import logging
+import os
+
+import numpy as np
+
+from QUET_BSX import OptimizedLPR
+
+logger = logging.getLogger('XParking.Export')
+
+MODELS = [
+    (OptimizedLPR.LP_DETECTOR_MODEL_PATH, OptimizedLPR.LP_DETECTOR_ONNX_PATH, OptimizedLPR.LP_DETECTOR_TS_PATH),
+    (OptimizedLPR.OCR_MODEL_PATH, OptimizedLPR.OCR_ONNX_PATH, OptimizedLPR.OCR_TS_PATH),
+]
+FORMATS = ['onnx', 'torchscript']
+
+def load_hub_model(pt_path):
+    import torch
+    return torch.hub.load('ultralytics/yolov5', 'custom', path=pt_path,
+                          force_reload=False, device='cpu', trust_repo=True)
+
+def unwrap_detection_model(hub_model):
+    # AutoShape -> DetectMultiBackend -> DetectionModel
+    net = hub_model.model
+    net = getattr(net, 'model', net)
+    net.float().eval()
+    for m in net.modules():
+        if type(m).__name__ == 'Detect':
+            m.inplace = False
+            m.dynamic = True
+            m.export = True
+    return net
+
+def model_names(hub_model):
+    names = hub_model.names
+    return dict(enumerate(names)) if isinstance(names, (list, tuple)) else dict(names)
+
+def export_onnx(hub_model, onnx_path, opset=12):
+    import torch
+    import onnx
+
+    net = unwrap_detection_model(hub_model)
+    dummy = torch.zeros(1, 3, 640, 640)
+    # torch >= 2.5 mặc định dùng dynamo exporter (cần onnxscript), giữ exporter TorchScript cũ
+    legacy = {'dynamo': False} if 'dynamo' in inspect.signature(torch.onnx.export).parameters else {}
+    torch.onnx.export(
+        net, dummy, onnx_path,
+        opset_version=opset,
+        do_constant_folding=True,
+        input_names=['images'],
+        output_names=['output0'],
+        dynamic_axes={'images': {0: 'batch', 2: 'height', 3: 'width'},
+                      'output0': {0: 'batch', 1: 'anchors'}},
+        **legacy
+    )
+
+    model = onnx.load(onnx_path)
+    onnx.checker.check_model(model)
+    for key, value in {'stride': int(hub_model.stride), 'names': model_names(hub_model)}.items():
+        meta = model.metadata_props.add()
+        meta.key, meta.value = key, str(value)
+    onnx.save(model, onnx_path)
+    logger.info(f"Exported {onnx_path}")
+
+def export_torchscript(hub_model, ts_path):
+    import torch
+    from function.lpr_backends import TORCHSCRIPT_META
+
+    net = unwrap_detection_model(hub_model)
+    traced = torch.jit.trace(net, torch.zeros(1, 3, 640, 640), strict=False)
+    meta = json.dumps({'stride': int(hub_model.stride), 'names': model_names(hub_model)})
+    traced.save(ts_path, _extra_files={TORCHSCRIPT_META: meta})
+    torch.save(traced.state_dict(), OptimizedLPR.weights_path(ts_path))
+    logger.info(f"Exported {ts_path}")
+
+def verify(hub_model, model_path, image_path, conf):
+    import cv2
+    from function.lpr_backends import OnnxYolo, TorchScriptYolo
+
+    frame = cv2.imread(image_path)
+    if frame is None:
+        logger.error(f"Could not load image: {image_path}")
+        return
+    hub_model.conf = conf
+    if model_path.endswith('.onnx'):
+        exported = OnnxYolo(model_path, conf=conf)
+    else:
+        exported = TorchScriptYolo(model_path, conf=conf)
+    ref = hub_model(frame, size=640).xyxy[0].cpu().numpy()
+    out = exported(frame, size=640).xyxy[0]
+    if ref.shape != out.shape:
+        logger.warning(f"{model_path}: {len(ref)} hub boxes vs {len(out)} exported boxes")
+        return
+    diff = float(np.abs(ref[:, :5] - out[:, :5]).max()) if len(ref) else 0.0
+    logger.info(f"{model_path}: {len(out)} boxes, max abs diff vs hub = {diff:.4f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Export XParking LPR models to ONNX / TorchScript")
+    parser.add_argument('--format', nargs='+', choices=FORMATS, default=FORMATS)
+    parser.add_argument('--opset', type=int, default=12)
+    parser.add_argument('--verify', help="image used to compare hub and exported boxes")
+    args = parser.parse_args()
+
+    for pt_path, onnx_path, ts_path in MODELS:
+        if not os.path.exists(pt_path):
+            logger.error(f"Model not found: {pt_path}")
+            continue
+        hub_model = load_hub_model(pt_path)
+        outputs = []
+        if 'onnx' in args.format:
+            export_onnx(hub_model, onnx_path, args.opset)
+            outputs.append(onnx_path)
+        if 'torchscript' in args.format:
+            export_torchscript(hub_model, ts_path)
+            outputs.append(ts_path)
+        if args.verify:
+            conf = (OptimizedLPR.DEFAULT_DETECTOR_CONF if pt_path == OptimizedLPR.LP_DETECTOR_MODEL_PATH
+                    else OptimizedLPR.DEFAULT_OCR_CONF)
+            for path in outputs:
+                verify(hub_model, path, args.verify, conf)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s | %(message)s', datefmt='%H:%M:%S')
+    main()
@@ -0,0 +1,123 @@
+import threading
+import time
+import numpy as np
+import cv2
+
+# shared contrast enhancement for LPR preprocessing, deskew and uploads.
+# exposure is measured on a small thumbnail first: well exposed frames are passed through,
+# moderately flat ones get a cheap per-channel LUT and only dark / hazy frames pay for the
+# BGR -> LAB -> CLAHE -> BGR round trip. CLAHE objects are cached per thread (they are not thread safe).
+# stats are kept per source (LPR, deskew, uploads), the CLAHE cost behind the savings estimate is
+# measured by calibrate() at model load, never on a frame that is being recognized
+
+STATS_SIZE = (64, 48)
+# mean luminance range and p5..p95 spread of a frame that needs no enhancement
+WELL_EXPOSED_MEAN = (80, 175)
+WELL_EXPOSED_SPREAD = 140
+# below this spread a global LUT can't recover local contrast, use CLAHE
+LUT_MIN_SPREAD = 60
+LUT_TARGET_MEAN = 128
+
+MODES = ('skip', 'lut', 'clahe')
+CALIBRATION_RUNS = 3
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+_stats = {}  # source -> counters
+_clahe_cost = {'s_per_px': None}
+
+def _empty_stats() -> dict:
+    return {'frames': 0, 'skip': 0, 'lut': 0, 'clahe': 0, 'time_s': 0.0, 'saved_s': 0.0}
+
+def get_clahe(clip_limit=2.0, tile_grid=(8, 8)):
+    cache = getattr(_local, 'clahe', None)
+    if cache is None:
+        cache = _local.clahe = {}
+    key = (float(clip_limit), tuple(tile_grid))
+    if key not in cache:
+        cache[key] = cv2.createCLAHE(clipLimit=key[0], tileGridSize=key[1])
+    return cache[key]
+
+def luminance_stats(img):
+    """(mean, p5, p95) of the luminance of a 64x48 thumbnail"""
+    small = cv2.resize(img, STATS_SIZE, interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+    cdf = np.cumsum(np.bincount(gray.ravel(), minlength=256))
+    p5, p95 = np.searchsorted(cdf, (0.05 * cdf[-1], 0.95 * cdf[-1]))
+    return float(gray.mean()), int(p5), int(p95)
+
+def choose_mode(stats):
+    mean, p5, p95 = stats
+    spread = p95 - p5
+    if spread >= WELL_EXPOSED_SPREAD and WELL_EXPOSED_MEAN[0] <= mean <= WELL_EXPOSED_MEAN[1]:
+        return 'skip'
+    if spread >= LUT_MIN_SPREAD:
+        return 'lut'
+    return 'clahe'
+
+def stretch_lut(stats):
+    # linear stretch of p5..p95 to the full range, then a gamma that moves the mean to mid grey
+    mean, p5, p95 = stats
+    x = np.clip((np.arange(256, dtype=np.float32) - p5) / max(p95 - p5, 1), 0, 1)
+    m = np.clip((mean - p5) / max(p95 - p5, 1), 0.05, 0.95)
+    gamma = np.log(LUT_TARGET_MEAN / 255) / np.log(m)
+    return (np.power(x, gamma) * 255 + 0.5).astype(np.uint8)
+
+def apply_clahe(img, clip_limit=2.0, tile_grid=(8, 8)):
+    clahe = get_clahe(clip_limit, tile_grid)
+    if img.ndim == 2:
+        return clahe.apply(img)
+    lab = cv2.cvtColor(img, cv2.COLOR_BGR2LAB)
+    l, a, b = cv2.split(lab)
+    return cv2.cvtColor(cv2.merge([clahe.apply(l), a, b]), cv2.COLOR_LAB2BGR)
+
+def calibrate(shape=(640, 640, 3), clip_limit=2.0, tile_grid=(8, 8)) -> float:
+    """Measure the CLAHE round trip per pixel on this machine (warm), used for the savings estimate"""
+    img = np.random.default_rng(0).integers(0, 256, shape, dtype=np.uint8)
+    apply_clahe(img, clip_limit, tile_grid)
+    start = time.perf_counter()
+    for _ in range(CALIBRATION_RUNS):
+        apply_clahe(img, clip_limit, tile_grid)
+    _clahe_cost['s_per_px'] = (time.perf_counter() - start) / CALIBRATION_RUNS / (shape[0] * shape[1])
+    return _clahe_cost['s_per_px']
+
+def enhance(img, clip_limit=2.0, tile_grid=(8, 8), adaptive=True, source='lpr'):
+    """Contrast enhance a BGR (or gray) image, skipping the work when the exposure is already fine"""
+    start = time.perf_counter()
+    exposure = luminance_stats(img) if adaptive else None
+    mode = choose_mode(exposure) if adaptive else 'clahe'
+    if mode == 'clahe':
+        out = apply_clahe(img, clip_limit, tile_grid)
+    elif mode == 'lut':
+        out = cv2.LUT(img, stretch_lut(exposure))
+    else:
+        out = img
+    _record(source, mode, img, time.perf_counter() - start)
+    return out
+
+def _record(source, mode, img, elapsed):
+    pixels = img.shape[0] * img.shape[1]
+    cost = _clahe_cost['s_per_px']
+    if mode == 'clahe':
+        # running estimate of what the full round trip costs per pixel on this machine
+        _clahe_cost['s_per_px'] = elapsed / pixels if cost is None else 0.9 * cost + 0.1 * elapsed / pixels
+    # nothing to compare against before calibrate() or the first CLAHE frame: no saving is claimed
+    saved = max(0.0, cost * pixels - elapsed) if mode != 'clahe' and cost is not None else 0.0
+    with _stats_lock:
+        counters = _stats.setdefault(source, _empty_stats())
+        counters['frames'] += 1
+        counters[mode] += 1
+        counters['time_s'] += elapsed
+        counters['saved_s'] += saved
+
+def stats(source='lpr') -> dict:
+    with _stats_lock:
+        result = dict(_stats.get(source) or _empty_stats())
+    frames = result['frames']
+    result['avg_ms'] = result['time_s'] / frames * 1000 if frames else 0.0
+    result['saved_ms_per_frame'] = result['saved_s'] / frames * 1000 if frames else 0.0
+    return result
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
@@ -0,0 +1,53 @@
+import threading
+import time
+from collections import deque
+import cv2
+
+# short per-camera history of frames scored by sharpness (variance of the Laplacian on a small
+# gray copy of the ROI), so recognition runs on the sharpest recent frame instead of whichever
+# frame was written last - usually the blurred one while the car is still braking
+
+SCORE_SIZE = (160, 120)
+HISTORY_SIZE = 8
+WINDOW = 0.3  # seconds of history a capture chooses from
+
+def sharpness(frame, roi=None) -> float:
+    if roi:
+        height, width = frame.shape[:2]
+        x1, y1, x2, y2 = roi
+        crop = frame[int(y1 * height):int(y2 * height), int(x1 * width):int(x2 * width)]
+        frame = crop if crop.size else frame
+    small = cv2.resize(frame, SCORE_SIZE, interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+    _, std = cv2.meanStdDev(cv2.Laplacian(gray, cv2.CV_16S, ksize=3))
+    return float(std[0, 0]) ** 2
+
+class SharpFrameBuffer:
+    def __init__(self, size=HISTORY_SIZE, window=WINDOW, roi=None):
+        self.window = window
+        # (x1, y1, x2, y2) as fractions of the frame, like LPRProfile.roi, or a callable returning it
+        # (read on every frame, so a profiles reload takes effect)
+        self.roi = roi
+        self.frames = deque(maxlen=max(1, size))  # (timestamp, score, frame)
+        self.lock = threading.Lock()
+
+    def add(self, frame, now: float | None = None):
+        """Score and keep frame; the buffer holds a reference, the caller must not modify it afterwards"""
+        roi = self.roi() if callable(self.roi) else self.roi
+        entry = (time.monotonic() if now is None else now, sharpness(frame, roi), frame)
+        with self.lock:
+            self.frames.append(entry)
+
+    def best(self, since: float | None = None, now: float | None = None):
+        """(frame, timestamp, score) of the sharpest frame of the last window seconds (newer than since),
+        the latest frame if the camera has stalled, None if there is no frame newer than since"""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            frames = list(self.frames)
+        if since is not None:
+            frames = [entry for entry in frames if entry[0] > since]
+        if not frames:
+            return None
+        recent = [entry for entry in frames if now - entry[0] <= self.window] or frames[-1:]
+        timestamp, score, frame = max(recent, key=lambda entry: entry[1])
+        return frame, timestamp, score
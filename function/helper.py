@@ -1,4 +1,12 @@
 import math
+import re
+import numpy as np
+
+MIN_CHARACTERS = 7
+MAX_CHARACTERS = 10
+LINE_TOLERANCE = 3
+# vietnamese plate: 2 digit province, series letter (+ letter/digit), 4-5 digit number, e.g. 59X1-58678, 30A-99887
+PLATE_PATTERN = re.compile(r'^\d{2}[A-Z][A-Z0-9]?\d{4,5}$')
 
 # license plate type classification helper function
 def linear_equation(x1, y1, x2, y2):
@@ -11,11 +19,60 @@ def check_point_linear(x, y, x1, y1, x2, y2):
     y_pred = a*x+b
     return(math.isclose(y_pred, y, abs_tol = 3))
 
+def is_plausible_plate(text):
+    return bool(text) and PLATE_PATTERN.match(text.upper().replace('-', '').replace(' ', '')) is not None
+
+def _to_numpy(det):
+    return det.cpu().numpy() if hasattr(det, 'cpu') else np.asarray(det)
+
 # detect character and number in license plate
 def read_plate(yolo_license_plate, im):
-    LP_type = "1"
     results = yolo_license_plate(im)
-    bb_list = results.pandas().xyxy[0].values.tolist()
+    return plate_from_detections(results.xyxy[0], results.names)
+
+# detect characters of several plate crops in a single forward pass
+def read_plates(yolo_license_plate, ims, with_conf=False):
+    results = yolo_license_plate(list(ims))
+    plates = [plate_from_detections(det, results.names) for det in results.xyxy]
+    if not with_conf:
+        return plates
+    # weakest character confidence of each plate
+    return [(plate, float(_to_numpy(det)[:, 4].min()) if len(det) else 0.0)
+            for plate, det in zip(plates, results.xyxy)]
+
+# assemble the plate string from raw character boxes (n, 6) [x1, y1, x2, y2, conf, cls]
+def plate_from_detections(det, names):
+    det = _to_numpy(det).astype(np.float64)
+    n = len(det)
+    if n < MIN_CHARACTERS or n > MAX_CHARACTERS:
+        return "unknown"
+    x_c = (det[:, 0] + det[:, 2]) / 2
+    y_c = (det[:, 1] + det[:, 3]) / 2
+    labels = [str(names[int(c)]) for c in det[:, 5]]
+
+    # 2 line plate if any character center is off the line through the leftmost and rightmost centers
+    two_lines = False
+    l, r = int(np.argmin(x_c)), int(np.argmax(x_c))
+    if x_c[l] != x_c[r]:
+        a, b = linear_equation(float(x_c[l]), float(y_c[l]), float(x_c[r]), float(y_c[r]))
+        y_pred = a * x_c + b
+        # same test as math.isclose(y_pred, y, abs_tol=3)
+        tol = np.maximum(1e-9 * np.maximum(np.abs(y_pred), np.abs(y_c)), LINE_TOLERANCE)
+        two_lines = bool(np.any(np.abs(y_pred - y_c) > tol))
+
+    if not two_lines:
+        return "".join(labels[i] for i in np.argsort(x_c, kind='stable'))
+
+    # sequential sum like the original loop, so int() truncation gives the same split
+    y_mean = int(int(sum(y_c.tolist())) / n)
+    lower = y_c.astype(np.int64) > y_mean
+    line_1, line_2 = np.flatnonzero(~lower), np.flatnonzero(lower)
+    return ("".join(labels[i] for i in line_1[np.argsort(x_c[line_1], kind='stable')]) + "-" +
+            "".join(labels[i] for i in line_2[np.argsort(x_c[line_2], kind='stable')]))
+
+# original list based assembly from results.pandas() rows, kept as reference for the benchmark below
+def plate_from_bb_list(bb_list):
+    LP_type = "1"
     if len(bb_list) == 0 or len(bb_list) < 7 or len(bb_list) > 10:
         return "unknown"
     center_list = []
@@ -41,7 +98,6 @@ def read_plate(yolo_license_plate, im):
                 LP_type = "2"
 
     y_mean = int(int(y_sum) / len(bb_list))
-    size = results.pandas().s
 
     # 1 line plates and 2 line plates
     line_1 = []
@@ -61,4 +117,45 @@ def read_plate(yolo_license_plate, im):
     else:
         for l in sorted(center_list, key = lambda x: x[0]):
             license_plate += str(l[2])
-    return license_plate
\ No newline at end of file
+    return license_plate
+
+# micro-benchmark: python -m function.helper
+def _random_plate_boxes(rng, names):
+    n = int(rng.integers(6, 12))
+    two_lines = rng.random() < 0.5
+    boxes = []
+    for i in range(n):
+        row = int(two_lines and i >= n // 2)
+        col = i - row * (n // 2) if two_lines else i
+        x = 10 + col * 28 + rng.normal(0, 2)
+        y = 20 + row * 50 + rng.normal(0, 2.5) + (col * rng.normal(0, 0.4))
+        boxes.append([x, y, x + 24, y + 40, rng.random(), int(rng.integers(0, len(names)))])
+    return np.array(boxes, dtype=np.float32)[rng.permutation(n)]
+
+def _benchmark(samples=5000):
+    import time
+    from function.lpr_backends import Detections
+
+    names = {i: c for i, c in enumerate("123456789ABCDEFGHKLMNPSTUVXYZ0")}
+    rng = np.random.default_rng(0)
+    results = [Detections([_random_plate_boxes(rng, names)], names, (1, 3, 640, 640)) for _ in range(samples)]
+
+    start = time.perf_counter()
+    # what read_plate did before: results.pandas() twice (once for the unused .s) + list assembly
+    old = []
+    for res in results:
+        old.append(plate_from_bb_list(res.pandas().xyxy[0].values.tolist()))
+        res.pandas().s
+    t_old = time.perf_counter() - start
+
+    start = time.perf_counter()
+    new = [plate_from_detections(res.xyxy[0], res.names) for res in results]
+    t_new = time.perf_counter() - start
+
+    mismatches = sum(a != b for a, b in zip(old, new))
+    print(f"{samples} plates, {mismatches} mismatches")
+    print(f"pandas + lists: {t_old / samples * 1e6:8.1f} us/plate")
+    print(f"numpy:          {t_new / samples * 1e6:8.1f} us/plate")
+
+if __name__ == "__main__":
+    _benchmark()
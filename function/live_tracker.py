@@ -0,0 +1,113 @@
+import logging
+import threading
+import time
+
+from function.plate_tracker import PlateTracker, MAX_OCR, OCR_GROWTH
+
+# continuous recognition for one camera: the detector runs on the latest frame a few times a
+# second, plate boxes are tracked and every track is OCR'd a bounded number of times. When the
+# gate trigger fires, the plate of the car at the barrier - the largest box of the latest detector
+# pass - is returned without running LPR again, if its track is confirmed. Every track alive at a
+# trigger is used up by it, so a car that already went through never answers the trigger of the car
+# behind it, and a lost track is never re-attached to the next car stopping in the same spot
+
+DEFAULT_INTERVAL = 0.2
+CONFIRMED_HOLD = 0.6  # the latest detector pass must be this recent (seconds) for a hand-out
+MAX_MISSED_SECONDS = 0.6  # short: the next car in the queue stops where the last one was
+
+class LivePlateTracker:
+    def __init__(self, lpr, get_frame, name: str, profile=None, interval=DEFAULT_INTERVAL, max_ocr=MAX_OCR,
+                 hold=CONFIRMED_HOLD, min_agree=2):
+        self.lpr = lpr
+        self.get_frame = get_frame
+        self.name = name
+        self.profile = profile
+        self.interval = interval
+        self.max_ocr = max_ocr
+        self.hold = hold
+        self.tracker = PlateTracker(max_missed=max(1, round(MAX_MISSED_SECONDS / interval)), min_agree=min_agree,
+                                    max_gap=0.0)
+        self.lock = threading.Lock()
+        self.latest = None  # (timestamp, [(area, track id, plate or None, frame)]) of the last detector pass
+        self.confirmed = set()  # ids of live tracks with a consensus plate
+        self.used = set()  # ids of live tracks alive at an earlier trigger
+        self.live = set()  # ids of all tracks the tracker still holds
+        self.thread = None
+        self.running = False
+        self.frames = 0
+        self.stats = {'frames': 0, 'ocr_runs': 0, 'confirmed': 0, 'handed_out': 0}
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, name=f'lpr-track-{self.name}', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def _loop(self):
+        while self.running:
+            started = time.monotonic()
+            try:
+                frame = self.get_frame() if self.lpr.is_ready() else None
+                if frame is not None:
+                    self.step(frame, started)
+            except Exception as e:
+                logging.error(f"Live tracking ({self.name}) error: {e}")
+            time.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def step(self, frame, now: float):
+        """One detector pass on frame, OCR for the tracks that still need it"""
+        detections = self.lpr.detect_plates(frame, self.profile, fast=True)
+        self.frames += 1
+        finished = self.tracker.update(detections, self.frames, now)
+        active = self.tracker.active()
+
+        pending = [track for track in active if track.needs_ocr(self.max_ocr, OCR_GROWTH)]
+        restarted = []
+        if pending:
+            crops = [self.lpr.crop_plate(frame, track.box) for track in pending]
+            for track, text in zip(pending, self.lpr.read_plates_batch(crops)):
+                if track.add_reading(text, track.conf, frame):
+                    restarted.append(track)
+
+        with self.lock:
+            self.stats['frames'] += 1
+            self.stats['ocr_runs'] += len(pending)
+            # a restarted vote is a different car in the same box, it is confirmed and handed out anew
+            for track in finished + restarted:
+                self.confirmed.discard(track.id)
+                self.used.discard(track.id)
+            view = []
+            for track in active:
+                plate = track.voter.consensus()
+                if plate and track.id not in self.confirmed:
+                    self.confirmed.add(track.id)
+                    self.stats['confirmed'] += 1
+                    logging.debug(f"Live tracking ({self.name}): track {track.id} -> {plate}")
+                view.append((track.area, track.id, plate, track.voter.best_payload(plate) if plate else None))
+            self.latest = (now, view)
+            self.live = {track.id for track in self.tracker.tracks}
+
+    def confirmed_plate(self, max_age: float | None = None):
+        """(plate, frame) of the car at the barrier: the largest box of the latest detector pass, if its track
+        is confirmed and was not handed out before. None otherwise (the caller runs LPR itself)"""
+        max_age = self.hold if max_age is None else max_age
+        now = time.monotonic()
+        with self.lock:
+            if self.latest is None or now - self.latest[0] > max_age or not self.latest[1]:
+                return None
+            # a closer car whose track is not confirmed yet wins over a confirmed one further away
+            _, track_id, plate, frame = max(self.latest[1], key=lambda entry: entry[0])
+            if not plate or track_id in self.used:
+                return None
+            self.used.add(track_id)
+            self.stats['handed_out'] += 1
+        return plate, frame
+
+    def consume(self):
+        """Called on every trigger: the cars seen so far belong to this trigger or an earlier one"""
+        with self.lock:
+            self.used |= self.live
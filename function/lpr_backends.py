@@ -0,0 +1,122 @@
+import ast
+import json
+from abc import ABC, abstractmethod
+from types import SimpleNamespace
+import numpy as np
+import cv2
+
+from function.yolo_numpy import (
+    IOU_THRES, MAX_DET, letterbox, autoshape_input_shape, non_max_suppression, scale_boxes
+)
+
+# hub-free runtime wrappers for exported YOLOv5 models, called the same way as the
+# torch.hub AutoShape models: model(im, size=640) -> results with .xyxy / .pandas()
+
+TORCHSCRIPT_META = 'config.txt'
+
+PANDAS_COLUMNS = ['xmin', 'ymin', 'xmax', 'ymax', 'confidence', 'class', 'name']
+
+class Detections:
+    def __init__(self, xyxy, names, shape=None):
+        self.xyxy = xyxy
+        self.names = names
+        self.n = len(xyxy)
+        self.s = shape
+
+    def pandas(self):
+        import pandas as pd
+        frames = []
+        for det in self.xyxy:
+            rows = [x[:5] + [int(x[5]), self.names[int(x[5])]] for x in det.tolist()]
+            frames.append(pd.DataFrame(rows, columns=PANDAS_COLUMNS))
+        return SimpleNamespace(xyxy=frames, s=self.s)
+
+class YoloRunner(ABC):
+    def __init__(self, names, stride=32, conf=0.25):
+        self.names = names
+        self.stride = stride
+        self.conf = conf
+        self.iou = IOU_THRES
+        self.max_det = MAX_DET
+
+    @abstractmethod
+    def forward(self, x: np.ndarray) -> np.ndarray:
+        """(n, 3, h, w) letterboxed input -> raw (n, anchors, 5 + classes) predictions"""
+
+    def __call__(self, ims, size=640) -> Detections:
+        ims = list(ims) if isinstance(ims, (list, tuple)) else [ims]
+        shape0 = []
+        for i, im in enumerate(ims):
+            im = im[..., :3] if im.ndim == 3 else cv2.cvtColor(im, cv2.COLOR_GRAY2BGR)
+            shape0.append(im.shape[:2])
+            ims[i] = im
+        shape1 = autoshape_input_shape(shape0, size, self.stride)
+        x = np.stack([letterbox(im, shape1)[0] for im in ims])
+        x = np.ascontiguousarray(x.transpose((0, 3, 1, 2))).astype(np.float32) / 255
+        dets = self.detect_letterboxed(x)
+        for i, det in enumerate(dets):
+            scale_boxes(shape1, det[:, :4], shape0[i])
+        return Detections(dets, self.names, x.shape)
+
+    def detect_letterboxed(self, x: np.ndarray) -> list:
+        # x: (n, 3, h, w) float32 in [0, 1], already letterboxed -> per image (k, 6) boxes in x coordinates
+        return non_max_suppression(self.forward(x), self.conf, self.iou, max_det=self.max_det)
+
+class HubYolo(YoloRunner):
+    # torch.hub AutoShape model run through the shared numpy pre/post-processing
+    def __init__(self, hub_model, conf=0.25):
+        import torch
+        self.torch = torch
+        self.model = hub_model.model
+        self.device = next(self.model.parameters()).device
+        self.fp16 = getattr(self.model, 'fp16', False)
+        super().__init__(hub_model.names, int(hub_model.stride), conf)
+
+    def forward(self, x: np.ndarray) -> np.ndarray:
+        with self.torch.inference_mode():
+            im = self.torch.from_numpy(x).to(self.device)
+            y = self.model(im.half() if self.fp16 else im)
+            y = y[0] if isinstance(y, (list, tuple)) else y
+            return y.float().cpu().numpy()
+
+class OnnxYolo(YoloRunner):
+    def __init__(self, path, conf=0.25, threads=None):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, sess_options=options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+        meta = self.session.get_modelmeta().custom_metadata_map
+        super().__init__(ast.literal_eval(meta['names']), int(meta.get('stride', 32)), conf)
+
+    def forward(self, x: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: x})[0]
+
+class TorchScriptYolo(YoloRunner):
+    def __init__(self, path, conf=0.25, weights_path=None):
+        import torch
+        self.torch = torch
+        extra = {TORCHSCRIPT_META: ''}
+        self.model = torch.jit.load(path, map_location='cpu', _extra_files=extra)
+        self.model.eval()
+        if weights_path:
+            self._mmap_weights(weights_path)
+        meta = json.loads(extra[TORCHSCRIPT_META])
+        names = {int(k): v for k, v in meta['names'].items()}
+        super().__init__(names, int(meta.get('stride', 32)), conf)
+
+    def _mmap_weights(self, weights_path):
+        # swap the weights loaded by jit.load for tensors backed by a memory-mapped state dict,
+        # so several replicas / processes share the same pages from the OS file cache
+        state = self.torch.load(weights_path, map_location='cpu', mmap=True, weights_only=True)
+        tensors = dict(self.model.named_parameters())
+        tensors.update(dict(self.model.named_buffers()))
+        for name, value in state.items():
+            if name in tensors:
+                tensors[name].data = value
+
+    def forward(self, x: np.ndarray) -> np.ndarray:
+        with self.torch.inference_mode():
+            return self.model(self.torch.from_numpy(x))[0].numpy()
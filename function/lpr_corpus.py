@@ -0,0 +1,45 @@
+import glob
+import os
+import re
+import numpy as np
+
+from function.plate_vote import normalize_plate
+
+# local evaluation corpus: the images the gates save after a successful read,
+# named "{plate}_{YYYYmmdd}_{HHMMSS}.jpg" in img_in_gate1 / img_out_gate1
+
+CORPUS_DIRS = ('img_in_gate1', 'img_out_gate1')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+FILENAME_PATTERN = re.compile(r'^(?P<plate>.+?)_\d{8}_\d{6}')
+
+def parse_label(path: str) -> str | None:
+    """Ground truth plate from a corpus file name, None if the name does not follow the pattern"""
+    match = FILENAME_PATTERN.match(os.path.basename(path))
+    return normalize_plate(match.group('plate')) if match else None
+
+def load_corpus(dirs=CORPUS_DIRS, limit: int | None = None) -> list:
+    """[(path, label)] for every labelled image under dirs (files or directories), sorted by path"""
+    paths = []
+    for entry in dirs:
+        if os.path.isdir(entry):
+            paths.extend(glob.glob(os.path.join(entry, '**', '*'), recursive=True))
+        elif os.path.isfile(entry):
+            paths.append(entry)
+    samples = []
+    for path in sorted(set(paths)):
+        label = parse_label(path) if path.lower().endswith(IMAGE_EXTENSIONS) else None
+        if label:
+            samples.append((path, label))
+    return samples[:limit] if limit else samples
+
+def is_correct(text: str | None, label: str) -> bool:
+    return bool(text) and normalize_plate(text) == label
+
+def latency_summary(values_ms) -> dict:
+    """mean / p50 / p95 / p99 / max of a list of latencies in ms"""
+    values = np.asarray(values_ms, dtype=np.float64)
+    if not values.size:
+        return {'count': 0}
+    p50, p95, p99 = np.percentile(values, (50, 95, 99))
+    return {'count': int(values.size), 'mean_ms': float(values.mean()), 'p50_ms': float(p50),
+            'p95_ms': float(p95), 'p99_ms': float(p99), 'max_ms': float(values.max())}
@@ -0,0 +1,108 @@
+import json
+import logging
+import os
+import threading
+import time
+
+# per-camera LPR settings: ROI crop, detector input size and thresholds.
+# profiles come from SystemConfig['lpr_profiles'] and can be overridden by a JSON file that is
+# re-read whenever it changes on disk, so a gate can be re-tuned without restarting
+
+PROFILE_FIELDS = ('roi', 'input_size', 'detector_conf', 'min_area')
+
+class LPRProfile:
+    def __init__(self, name, roi=None, input_size=640, detector_conf=None, min_area=1000):
+        self.name = name
+        self.roi = tuple(float(v) for v in roi) if roi else None  # (x1, y1, x2, y2) as fractions of the frame
+        self.input_size = int(input_size)
+        self.detector_conf = float(detector_conf) if detector_conf is not None else None  # None = model default
+        self.min_area = float(min_area)
+
+    def crop(self, frame):
+        """Cut the ROI out of frame, returns (view, (x_offset, y_offset))"""
+        if not self.roi:
+            return frame, (0, 0)
+        height, width = frame.shape[:2]
+        x1, y1, x2, y2 = self.roi
+        x1, x2 = int(max(0.0, x1) * width), int(min(1.0, x2) * width)
+        y1, y2 = int(max(0.0, y1) * height), int(min(1.0, y2) * height)
+        if x2 <= x1 or y2 <= y1:
+            return frame, (0, 0)
+        return frame[y1:y2, x1:x2], (x1, y1)
+
+    def __repr__(self):
+        return f"LPRProfile({self.name}, roi={self.roi}, size={self.input_size}, conf={self.detector_conf})"
+
+class ProfileStore:
+    RELOAD_CHECK_INTERVAL = 1.0
+
+    def __init__(self, profiles: dict | None = None, path: str | None = None, defaults: dict | None = None):
+        self.base = profiles or {}
+        self.path = path
+        self.defaults = defaults or {}
+        self.lock = threading.Lock()
+        self.file_mtime = None
+        self.last_check = 0.0
+        self.profiles = self._build(self.base)
+
+    def _build(self, overrides: dict) -> dict:
+        default = {**self.defaults, **self._fields(overrides.get('default', {}))}
+        profiles = {'default': LPRProfile('default', **default)}
+        for name, values in overrides.items():
+            if name != 'default':
+                profiles[name] = LPRProfile(name, **{**default, **self._fields(values)})
+        return profiles
+
+    @staticmethod
+    def _fields(values: dict) -> dict:
+        unknown = set(values) - set(PROFILE_FIELDS)
+        if unknown:
+            logging.warning(f"Ignoring unknown LPR profile fields: {', '.join(sorted(unknown))}")
+        return {k: v for k, v in values.items() if k in PROFILE_FIELDS}
+
+    def _reload_if_changed(self):
+        now = time.monotonic()
+        if not self.path or now - self.last_check < self.RELOAD_CHECK_INTERVAL:
+            return
+        self.last_check = now
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if mtime == self.file_mtime:
+            return
+        overrides = dict(self.base)
+        if mtime is not None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    for name, values in json.load(f).items():
+                        overrides[name] = {**overrides.get(name, {}), **values}
+            except (OSError, ValueError, AttributeError) as e:
+                # keep the current profiles until the file is valid again
+                logging.error(f"Invalid LPR profile file {self.path}: {e}")
+                return
+        try:
+            profiles = self._build(overrides)
+        except (TypeError, ValueError) as e:
+            logging.error(f"Invalid LPR profile in {self.path}: {e}")
+            return
+        self.profiles = profiles
+        self.file_mtime = mtime
+        logging.info(f"LPR profiles loaded: {', '.join(sorted(profiles))}")
+
+    def all(self) -> list:
+        with self.lock:
+            self._reload_if_changed()
+            return list(self.profiles.values())
+
+    def get(self, name=None) -> LPRProfile:
+        if isinstance(name, LPRProfile):
+            return name
+        with self.lock:
+            self._reload_if_changed()
+            profiles = self.profiles
+        if name in profiles:
+            return profiles[name]
+        # "in_gate2" falls back to "in", then to "default"
+        base = name.split('_gate')[0] if isinstance(name, str) else None
+        return profiles.get(base, profiles['default'])
@@ -0,0 +1,106 @@
+import threading
+import time
+import cv2
+
+# cheap motion detection for the camera reader threads: a tiny gray thumbnail of the ROI is
+# differenced against the previous one, a few consecutive moving frames fire the gate once.
+# the gate starts a speculative recognition whose result is kept for a short window, so the
+# IR trigger that follows can take it instead of running LPR from scratch. The caller still has to
+# check that the result belongs to the car of the trigger (the gate is quiet during its cooldown)
+
+THUMB_SIZE = (80, 60)
+PIXEL_THRESHOLD = 25  # gray level change counted as motion
+MIN_MOVING_FRACTION = 0.01  # share of the ROI that has to change
+SUSTAIN_FRAMES = 3
+COOLDOWN = 2.0  # seconds before the gate can fire again
+SPECULATIVE_WINDOW = 3.0
+TAKE_WAIT = 0.3  # seconds a trigger waits for a speculation still running
+
+class MotionGate:
+    def __init__(self, roi=None, threshold=PIXEL_THRESHOLD, min_fraction=MIN_MOVING_FRACTION,
+                 sustain=SUSTAIN_FRAMES, cooldown=COOLDOWN):
+        # (x1, y1, x2, y2) as fractions of the frame, like LPRProfile.roi, or a callable returning it
+        # (read on every frame, so a profiles reload takes effect)
+        self.roi = roi
+        self.current_roi = None
+        self.threshold = threshold
+        self.min_fraction = min_fraction
+        self.sustain = sustain
+        self.cooldown = cooldown
+        self.previous = None
+        self.moving = 0
+        self.last_fired = float('-inf')
+        self.fraction = 0.0
+
+    def _thumbnail(self, frame, roi):
+        if roi:
+            height, width = frame.shape[:2]
+            x1, y1, x2, y2 = roi
+            roi = frame[int(y1 * height):int(y2 * height), int(x1 * width):int(x2 * width)]
+            frame = roi if roi.size else frame
+        small = cv2.resize(frame, THUMB_SIZE, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+    def update(self, frame, now: float | None = None) -> bool:
+        """Feed one frame, True once when motion has lasted sustain frames (then quiet for cooldown)"""
+        roi = self.roi() if callable(self.roi) else self.roi
+        if roi != self.current_roi:
+            # thumbnails of different regions are not compared
+            self.current_roi, self.previous, self.moving = roi, None, 0
+        thumb = self._thumbnail(frame, roi)
+        previous, self.previous = self.previous, thumb
+        if previous is None:
+            return False
+        self.fraction = float((cv2.absdiff(thumb, previous) > self.threshold).mean())
+        self.moving = self.moving + 1 if self.fraction >= self.min_fraction else 0
+        now = time.monotonic() if now is None else now
+        if self.moving >= self.sustain and now - self.last_fired >= self.cooldown:
+            self.last_fired = now
+            self.moving = 0
+            return True
+        return False
+
+class SpeculativeSlot:
+    # latest speculative recognition of one camera, handed out at most once
+    def __init__(self, window=SPECULATIVE_WINDOW):
+        self.window = window
+        self.lock = threading.Lock()
+        self.started = None
+        self.future = None
+        self.stats = {'started': 0, 'used': 0, 'expired': 0, 'stale': 0}
+
+    def busy(self) -> bool:
+        with self.lock:
+            return self.future is not None and not self.future.done()
+
+    def start(self, future, now: float | None = None):
+        with self.lock:
+            self.started = time.monotonic() if now is None else now
+            self.future = future
+            self.stats['started'] += 1
+
+    def take(self, now: float | None = None, not_before: float | None = None, max_wait=TAKE_WAIT):
+        """Result of a speculation started within the window and after not_before (the previous trigger),
+        waits up to max_wait for it if still running, else None"""
+        with self.lock:
+            future, started = self.future, self.started
+            now = time.monotonic() if now is None else now
+            if future is None:
+                return None
+            self.future = None
+            if now - started > self.window:
+                self.stats['expired'] += 1
+                return None
+            if not_before is not None and started <= not_before:
+                # started for the car the previous trigger already handled
+                self.stats['stale'] += 1
+                return None
+        try:
+            # a speculation that needs longer is barely ahead of a fresh recognition
+            result = future.result(timeout=max(0.0, min(max_wait, started + self.window - now)))
+        except Exception:
+            return None
+        if result is not None:
+            with self.lock:
+                self.stats['used'] += 1
+        return result
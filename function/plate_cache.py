@@ -0,0 +1,77 @@
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import cv2
+
+# size-bounded, TTL-evicting cache of OCR results for a car standing at the barrier, so retriggers
+# skip OCR. The key is exact: camera, plate box position (quantized to absorb a pixel of detector
+# jitter) and a 16x8 difference hash of the crop. There is no nearest-neighbour lookup - different
+# plates can hash a bit apart, so a near match would hand out the previous car's plate
+
+FINGERPRINT_SIZE = (17, 8)
+BBOX_GRID = 8  # px
+
+def fingerprint(crop: np.ndarray) -> bytes:
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    small = cv2.resize(gray, FINGERPRINT_SIZE, interpolation=cv2.INTER_AREA)
+    return np.packbits(small[:, 1:] > small[:, :-1]).tobytes()
+
+def cache_key(scope, box, crop: np.ndarray) -> tuple:
+    """scope: camera / profile name, box: plate box the crop was cut from"""
+    return (scope, *(int(v) // BBOX_GRID for v in box[:4]), fingerprint(crop))
+
+class PlateCache:
+    def __init__(self, max_size=128, ttl=2.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()  # insertion order == expiry order, hits do not reorder
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _expire(self, now):
+        while self.entries:
+            key, (_, timestamp) = next(iter(self.entries.items()))
+            if now - timestamp <= self.ttl:
+                break
+            del self.entries[key]
+            self.evictions += 1
+
+    def get(self, key):
+        with self.lock:
+            # an entry expires ttl seconds after the OCR that produced it, however often it is hit
+            self._expire(time.monotonic())
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, text):
+        if self.max_size <= 0:
+            return
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = (text, time.monotonic())
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,149 @@
+import itertools
+import numpy as np
+
+from function.plate_vote import PlateVoter, normalize_plate, plate_distance
+
+# lightweight IoU tracker for plate boxes over consecutive frames, with a centroid fallback for
+# boxes that moved too far to overlap (low detector rate).
+# every track keeps a PlateVoter, so a plate is read only a few times per vehicle pass:
+# once when it appears, again when the box has grown (car came closer) or, for a car standing
+# still, every reread_interval seconds, never after the readings agree. A track that is not seen for max_missed frames is finished. A lost track is
+# re-attached by overlap only within max_gap seconds, and a reading that is clearly another plate
+# restarts the track's vote, so two cars in the same spot never mix into one plate
+
+IOU_THRESHOLD = 0.2
+MAX_GAP = 0.5  # seconds a lost track can still be re-attached by overlap (detector flicker)
+MAX_CENTER_SHIFT = 1.0  # centroid fallback: max centre distance, in track box diagonals (only for tracks
+                        # seen in the previous frame, a lost track is never re-attached to a car by position)
+MAX_MISSED = 10
+MIN_HITS = 2
+MAX_OCR = 3
+OCR_GROWTH = 1.3  # box area must grow by this factor before the plate is read again
+REREAD_INTERVAL = 0.5  # seconds, a box that does not grow is read again after this long
+MAX_DISAGREEMENT = 2  # edit distance to the track's plate above which a reading is another car
+
+def box_area(boxes: np.ndarray) -> np.ndarray:
+    return np.clip(boxes[:, 2] - boxes[:, 0], 0, None) * np.clip(boxes[:, 3] - boxes[:, 1], 0, None)
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """(len(a), len(b)) IoU of two arrays of [x1, y1, x2, y2] boxes"""
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    union = box_area(a)[:, None] + box_area(b)[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+class Track:
+    def __init__(self, track_id: int, box: np.ndarray, conf: float, frame_index: int, timestamp: float,
+                 min_agree=2):
+        self.id = track_id
+        self.box = box
+        self.conf = conf
+        self.first_frame = self.last_frame = frame_index
+        self.first_ts = self.last_ts = timestamp
+        self.hits = 1
+        self.missed = 0
+        self.ocr_runs = 0
+        self.ocr_area = 0.0
+        self.ocr_ts = timestamp
+        self.min_agree = min_agree
+        self.voter = PlateVoter(min_agree)
+
+    @property
+    def area(self) -> float:
+        return float(box_area(self.box[None])[0])
+
+    @property
+    def plate(self) -> str | None:
+        return self.voter.consensus() or self.voter.vote()
+
+    def update(self, box: np.ndarray, conf: float, frame_index: int, timestamp: float):
+        self.box = box
+        self.conf = conf
+        self.last_frame = frame_index
+        self.last_ts = timestamp
+        self.hits += 1
+        self.missed = 0
+
+    def needs_ocr(self, max_ocr=MAX_OCR, growth=OCR_GROWTH, interval=REREAD_INTERVAL) -> bool:
+        if self.ocr_runs >= max_ocr or self.voter.consensus():
+            return False
+        return (self.ocr_runs == 0 or self.area >= self.ocr_area * growth
+                or self.last_ts - self.ocr_ts >= interval)
+
+    def add_reading(self, text: str, confidence: float, payload=None) -> bool:
+        """Returns True if the reading disagreed with the track's plate and restarted the vote"""
+        restarted = False
+        if text and text != "unknown":
+            current = self.plate
+            if current and plate_distance(normalize_plate(text), current) > MAX_DISAGREEMENT:
+                # another car took the box over: drop the old readings instead of voting them together
+                self.voter = PlateVoter(self.min_agree)
+                self.ocr_runs = 0
+                restarted = True
+            self.voter.add(text, confidence, payload)
+        self.ocr_runs += 1
+        self.ocr_area = self.area
+        self.ocr_ts = self.last_ts
+        return restarted
+
+class PlateTracker:
+    def __init__(self, iou_threshold=IOU_THRESHOLD, max_missed=MAX_MISSED, min_hits=MIN_HITS, min_agree=2,
+                 max_center_shift=MAX_CENTER_SHIFT, max_gap=MAX_GAP):
+        self.iou_threshold = iou_threshold
+        self.max_gap = max_gap
+        self.max_center_shift = max_center_shift
+        self.max_missed = max_missed
+        self.min_hits = min_hits
+        self.min_agree = min_agree
+        self.tracks = []
+        self.ids = itertools.count(1)
+
+    def update(self, detections: np.ndarray, frame_index: int, timestamp: float) -> list:
+        """Match (k, >=5) [x1, y1, x2, y2, conf, ...] detections to the tracks, returns the finished tracks"""
+        detections = np.asarray(detections, dtype=np.float32)
+        if detections.size == 0:
+            detections = np.zeros((0, 6), dtype=np.float32)
+        unmatched = set(range(len(detections)))
+        matched_tracks = set()
+        if self.tracks and len(detections):
+            boxes = np.stack([t.box for t in self.tracks])
+            ious = iou_matrix(boxes, detections[:, :4])
+            shifts = np.linalg.norm((boxes[:, None, :2] + boxes[:, None, 2:]) / 2
+                                    - (detections[None, :, :2] + detections[None, :, 2:4]) / 2, axis=2)
+            shifts /= np.maximum(np.hypot(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]), 1.0)[:, None]
+            recent = [track.missed == 0 or timestamp - track.last_ts <= self.max_gap for track in self.tracks]
+            # greedy assignment: best overlap first, then the nearest centres for what is left
+            pairs = [(t, d) for t, d in zip(*np.unravel_index(np.argsort(-ious, axis=None), ious.shape))
+                     if ious[t, d] >= self.iou_threshold and recent[t]]
+            pairs += [(t, d) for t, d in zip(*np.unravel_index(np.argsort(shifts, axis=None), shifts.shape))
+                      if shifts[t, d] <= self.max_center_shift and self.tracks[t].missed == 0]
+            for t, d in pairs:
+                if t in matched_tracks or d not in unmatched:
+                    continue
+                self.tracks[t].update(detections[d, :4].copy(), float(detections[d, 4]), frame_index, timestamp)
+                matched_tracks.add(t)
+                unmatched.discard(d)
+
+        finished, alive = [], []
+        for t, track in enumerate(self.tracks):
+            if t not in matched_tracks:
+                track.missed += 1
+            (finished if track.missed > self.max_missed else alive).append(track)
+        for d in sorted(unmatched):
+            alive.append(Track(next(self.ids), detections[d, :4].copy(), float(detections[d, 4]),
+                               frame_index, timestamp, self.min_agree))
+        self.tracks = alive
+        return [track for track in finished if track.hits >= self.min_hits]
+
+    def active(self) -> list:
+        """Tracks seen in the last update"""
+        return [track for track in self.tracks if track.missed == 0]
+
+    def flush(self) -> list:
+        """Finish every remaining track (end of the video)"""
+        finished = [track for track in self.tracks if track.hits >= self.min_hits]
+        self.tracks = []
+        return finished
@@ -0,0 +1,60 @@
+from collections import Counter, defaultdict
+
+# temporal voting over the readings of a short burst of frames of the same car.
+# readings are compared without the 2 line separator, the way _recognize_plate returns them
+
+def normalize_plate(text: str) -> str:
+    return text.upper().replace('-', '').replace(' ', '').strip()
+
+def plate_distance(a: str, b: str) -> int:
+    """Edit distance of two normalized plates, an OCR slip is 1 or 2, another car is more"""
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+class PlateVoter:
+    def __init__(self, min_agree=2):
+        self.min_agree = max(1, min_agree)
+        self.readings = []  # (plate, confidence, payload, cached)
+
+    def add(self, text: str, confidence: float = 1.0, payload=None, cached=False) -> str | None:
+        """Add one frame's reading, return the plate once min_agree frames read exactly the same.
+        A cached reading repeats an earlier OCR result: it counts as agreement only for a plate this voter
+        has OCR'd itself (the car has not changed since), otherwise it only joins the final vote"""
+        plate = normalize_plate(text)
+        if plate:
+            self.readings.append((plate, float(confidence), payload, cached))
+        return self.consensus()
+
+    def consensus(self) -> str | None:
+        fresh = {plate for plate, _, _, cached in self.readings if not cached}
+        counts = Counter(plate for plate, _, _, _ in self.readings if plate in fresh)
+        if not counts:
+            return None
+        plate, count = counts.most_common(1)[0]
+        return plate if count >= self.min_agree else None
+
+    def vote(self) -> str | None:
+        """Per character position vote, weighted by confidence, over the readings of the winning length"""
+        if not self.readings:
+            return None
+        by_length = defaultdict(float)
+        for plate, conf, _, _ in self.readings:
+            by_length[len(plate)] += conf
+        length = max(by_length, key=by_length.get)
+
+        positions = [defaultdict(float) for _ in range(length)]
+        for plate, conf, _, _ in self.readings:
+            if len(plate) == length:
+                for i, char in enumerate(plate):
+                    positions[i][char] += conf
+        return "".join(max(votes, key=votes.get) for votes in positions)
+
+    def best_payload(self, plate: str):
+        """Payload (e.g. the frame) of the most confident reading of plate, or of any reading"""
+        matching = [r for r in self.readings if r[0] == plate] or self.readings
+        return max(matching, key=lambda r: r[1])[2] if matching else None
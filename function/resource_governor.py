@@ -0,0 +1,135 @@
+import logging
+import os
+import sys
+import threading
+from contextlib import contextmanager, nullcontext
+import cv2
+
+# one place that decides how many threads / which cores the inference libraries get.
+# torch intra-op, onnxruntime and OpenCV pools are sized from a single inference budget so they
+# don't oversubscribe the gate PC, and inference can optionally be kept on its own cores while the
+# camera readers, MQTT and the Tk mainloop stay on the I/O cores (thread affinity, Linux only)
+
+ROLES = ('inference', 'io')
+DEFAULT_INTEROP_THREADS = 1
+
+_lock = threading.Lock()
+_settings = {
+    'inference_threads': None,
+    'interop_threads': DEFAULT_INTEROP_THREADS,
+    'cv_threads': None,
+    'cores': {'inference': None, 'io': None},
+    'applied': False,
+    'errors': [],
+}
+
+def available_cores() -> list:
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def affinity_supported() -> bool:
+    return hasattr(os, 'sched_setaffinity')
+
+def configure(config: dict | None = None):
+    """Read the budget from SystemConfig; core lists are clipped to the cores this process may use"""
+    config = config or {}
+    allowed = set(available_cores())
+    cores = {}
+    for role in ROLES:
+        wanted = config.get(f'cpu_{role}_cores') or []
+        cores[role] = sorted(allowed.intersection(int(c) for c in wanted)) or None
+    threads = config.get('cpu_inference_threads') or len(cores['inference'] or allowed)
+    with _lock:
+        _settings.update(
+            inference_threads=max(1, int(threads)),
+            interop_threads=max(1, int(config.get('torch_interop_threads') or DEFAULT_INTEROP_THREADS)),
+            cv_threads=config.get('cv_threads'),
+            cores=cores,
+        )
+
+def _torch():
+    # only a torch the LPR backend already imported is configured, importing it here costs seconds
+    return sys.modules.get('torch')
+
+def inference_threads() -> int:
+    """Total thread budget for model inference (split between the LPR replicas)"""
+    return _settings['inference_threads'] or len(available_cores())
+
+def threads_per_worker(workers: int) -> int:
+    return max(1, inference_threads() // max(1, workers))
+
+def apply(threads_per_replica: int | None = None):
+    """Set the torch / OpenCV pools. torch interop threads can only be set once, before any parallel work"""
+    per_replica = threads_per_replica or inference_threads()
+    cv_threads = _settings['cv_threads']
+    cv2.setNumThreads(int(cv_threads) if cv_threads is not None else per_replica)
+    torch = _torch()
+    if torch is not None:
+        torch.set_num_threads(per_replica)
+        if not _settings['applied']:
+            try:
+                torch.set_num_interop_threads(_settings['interop_threads'])
+            except RuntimeError as e:
+                _settings['errors'].append(f"interop threads: {e}")
+                logging.warning(f"torch interop threads not changed: {e}")
+    _settings['applied'] = True
+
+def pin(role: str) -> bool:
+    """Restrict the calling thread (and the threads it starts later) to the cores of role"""
+    cores = _settings['cores'].get(role)
+    if not cores or not affinity_supported():
+        return False
+    try:
+        os.sched_setaffinity(0, cores)
+        return True
+    except OSError as e:
+        _settings['errors'].append(f"pin {role}: {e}")
+        return False
+
+def affinity(role: str):
+    """Context manager running the block on the cores of role, then restoring the thread's mask"""
+    if not _settings['cores'].get(role) or not affinity_supported():
+        return nullcontext()
+    return _pinned(role)
+
+@contextmanager
+def _pinned(role):
+    previous = os.sched_getaffinity(0)
+    pinned = pin(role)
+    try:
+        yield
+    finally:
+        if pinned:
+            os.sched_setaffinity(0, previous)
+
+def thread_initializer(role: str):
+    """ThreadPoolExecutor initializer that pins each worker thread to role"""
+    return lambda: pin(role)
+
+def diagnostics() -> dict:
+    """Effective settings, as the libraries report them"""
+    info = {
+        'cpu_count': os.cpu_count(),
+        'available_cores': available_cores(),
+        'inference_threads': inference_threads(),
+        'inference_cores': _settings['cores']['inference'],
+        'io_cores': _settings['cores']['io'],
+        'affinity_supported': affinity_supported(),
+        'cv_threads': cv2.getNumThreads(),
+        'cv_optimized': cv2.useOptimized(),
+        'threads': sorted(t.name for t in threading.enumerate()),
+        'errors': list(_settings['errors']),
+    }
+    torch = _torch()
+    if torch is not None:
+        info.update(torch_threads=torch.get_num_threads(), torch_interop_threads=torch.get_num_interop_threads())
+    if affinity_supported():
+        info['current_thread_cores'] = sorted(os.sched_getaffinity(0))
+    return info
+
+def log_diagnostics(extra: dict | None = None):
+    info = {**diagnostics(), **(extra or {})}
+    threads = info.pop('threads')
+    logging.info("Resources: " + ", ".join(f"{key}={value}" for key, value in info.items()))
+    logging.info(f"Resources: {len(threads)} python threads: {', '.join(threads)}")
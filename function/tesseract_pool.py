@@ -0,0 +1,100 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import cv2
+
+# long-lived tesseract workers for plate crops.
+# with tesserocr every worker thread keeps its own initialised TessBaseAPI (no process per crop, the
+# GIL is released while recognising); without it pytesseract is used with a hard timeout per call.
+# the pytesseract fallback still starts one tesseract process per crop, so it is no faster than
+# calling pytesseract directly - only the deadline and the race against the YOLO stages remain
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+AVAILABLE = tesserocr is not None or pytesseract is not None
+
+WHITELIST = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+PYTESSERACT_CONFIG = f'--oem 3 --psm 8 -c tessedit_char_whitelist={WHITELIST}'
+MIN_LENGTH = 4
+
+def prepare(crop_img):
+    gray = cv2.cvtColor(crop_img, cv2.COLOR_BGR2GRAY) if crop_img.ndim == 3 else crop_img
+    _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return thresh
+
+def clean(text):
+    text = text.strip().replace(' ', '')
+    if len(text) >= MIN_LENGTH and text.isalnum():
+        return text.upper()
+    return "unknown"
+
+class TesseractPool:
+    def __init__(self, workers=1, timeout=1.0):
+        self.timeout = timeout
+        self.local = threading.local()
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='tesseract',
+                                           initializer=self._init_worker)
+        self.stats = {'requests': 0, 'timeouts': 0, 'cancelled': 0}
+        self.lock = threading.Lock()
+
+    def _init_worker(self):
+        if tesserocr is not None:
+            api = tesserocr.PyTessBaseAPI(psm=tesserocr.PSM.SINGLE_WORD, oem=tesserocr.OEM.DEFAULT)
+            api.SetVariable('tessedit_char_whitelist', WHITELIST)
+            self.local.api = api
+
+    def _recognize(self, thresh, deadline):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return "unknown"
+        api = getattr(self.local, 'api', None)
+        if api is not None:
+            height, width = thresh.shape
+            api.SetImageBytes(thresh.tobytes(), width, height, 1, width)
+            return clean(api.GetUTF8Text())
+        try:
+            return clean(pytesseract.image_to_string(thresh, config=PYTESSERACT_CONFIG, timeout=remaining))
+        except RuntimeError:
+            # pytesseract kills the process and raises RuntimeError on timeout
+            return "unknown"
+
+    def submit(self, crop_img):
+        """Start recognising crop_img in the background, returns a Future[str] with its own deadline"""
+        with self.lock:
+            self.stats['requests'] += 1
+        deadline = time.monotonic() + self.timeout
+        future = self.executor.submit(self._recognize, prepare(crop_img), deadline)
+        future.deadline = deadline
+        return future
+
+    def result(self, future) -> str:
+        """Wait for a submitted crop until its deadline, "unknown" if it does not make it"""
+        try:
+            return future.result(timeout=max(0.0, future.deadline - time.monotonic()))
+        except FutureTimeout:
+            self.cancel(future)
+            with self.lock:
+                self.stats['timeouts'] += 1
+            return "unknown"
+        except Exception:
+            return "unknown"
+
+    def cancel(self, future):
+        # a queued request is dropped; one already inside tesseract finishes and is discarded
+        if future.cancel():
+            with self.lock:
+                self.stats['cancelled'] += 1
+
+    def recognize(self, crop_img) -> str:
+        return self.result(self.submit(crop_img))
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
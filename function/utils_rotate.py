@@ -1,15 +1,13 @@
 import numpy as np
 import math
 import cv2
+from function.enhance import enhance
+
+MAX_SKEW_ANGLE = 30  # degrees
 
 def changeContrast(img):
-    lab= cv2.cvtColor(img, cv2.COLOR_BGR2LAB)
-    l_channel, a, b = cv2.split(lab)
-    clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8,8))
-    cl = clahe.apply(l_channel)
-    limg = cv2.merge((cl,a,b))
-    enhanced_img = cv2.cvtColor(limg, cv2.COLOR_LAB2BGR)
-    return enhanced_img
+    # always CLAHE: the edges for skew estimation need the local contrast even on well exposed plates
+    return enhance(img, clip_limit=3.0, tile_grid=(8, 8), adaptive=False, source='deskew')
 
 def rotate_image(image, angle):
     image_center = tuple(np.array(image.shape[1::-1]) / 2)
@@ -18,41 +16,37 @@ def rotate_image(image, angle):
     return result
 
 def compute_skew(src_img, center_thres):
+    # skew angle (degrees) of a plate crop: length weighted median angle of the near horizontal hough lines
     if len(src_img.shape) == 3:
         h, w, _ = src_img.shape
     elif len(src_img.shape) == 2:
         h, w = src_img.shape
     else:
         print('upsupported image type')
+        return 0.0
     img = cv2.medianBlur(src_img, 3)
     edges = cv2.Canny(img,  threshold1 = 30,  threshold2 = 100, apertureSize = 3, L2gradient = True)
     lines = cv2.HoughLinesP(edges, 1, math.pi/180, 30, minLineLength=w / 1.5, maxLineGap=h/3.0)
     if lines is None:
-        return 1
-
-    min_line = 100
-    min_line_pos = 0
-    for i in range (len(lines)):
-        for x1, y1, x2, y2 in lines[i]:
-            center_point = [((x1+x2)/2), ((y1+y2)/2)]
-            if center_thres == 1:
-                if center_point[1] < 7:
-                    continue
-            if center_point[1] < min_line:
-                min_line = center_point[1]
-                min_line_pos = i
-
-    angle = 0.0
-    nlines = lines.size
-    cnt = 0
-    for x1, y1, x2, y2 in lines[min_line_pos]:
-        ang = np.arctan2(y2 - y1, x2 - x1)
-        if math.fabs(ang) <= 30: # excluding extreme rotations
-            angle += ang
-            cnt += 1
-    if cnt == 0:
         return 0.0
-    return (angle / cnt)*180/math.pi
+
+    # (n, 1, 4) on opencv 4, (n, 4) on opencv 5
+    x1, y1, x2, y2 = lines.reshape(-1, 4).astype(np.float64).T
+    if center_thres == 1:
+        # ignore lines hugging the top edge of the crop
+        keep = (y1 + y2) / 2 >= 7
+        x1, y1, x2, y2 = x1[keep], y1[keep], x2[keep], y2[keep]
+
+    # direction independent angle in (-90, 90], excluding extreme rotations
+    angles = (np.degrees(np.arctan2(y2 - y1, x2 - x1)) + 90) % 180 - 90
+    keep = np.abs(angles) <= MAX_SKEW_ANGLE
+    if not keep.any():
+        return 0.0
+    angles = angles[keep]
+    lengths = np.hypot(x2 - x1, y2 - y1)[keep]
+    order = np.argsort(angles)
+    cumulative = np.cumsum(lengths[order])
+    return float(angles[order][np.searchsorted(cumulative, cumulative[-1] / 2)])
 
 def deskew(src_img, change_cons, center_thres):
     if change_cons == 1:
@@ -0,0 +1,136 @@
+import math
+import numpy as np
+import cv2
+
+# numpy port of the yolov5 AutoShape pre/post-processing (letterbox, NMS, scale boxes)
+# so that exported models return the same boxes as the torch.hub wrappers
+
+LETTERBOX_COLOR = (114, 114, 114)
+IOU_THRES = 0.45
+MAX_DET = 1000
+MAX_NMS = 30000
+MAX_WH = 7680
+
+def make_divisible(x, divisor):
+    return math.ceil(x / divisor) * divisor
+
+def letterbox(im, new_shape, color=LETTERBOX_COLOR):
+    # same as yolov5 letterbox(auto=False, scaleup=True)
+    shape = im.shape[:2]
+    if isinstance(new_shape, int):
+        new_shape = (new_shape, new_shape)
+    r = min(new_shape[0] / shape[0], new_shape[1] / shape[1])
+    new_unpad = int(round(shape[1] * r)), int(round(shape[0] * r))
+    dw, dh = (new_shape[1] - new_unpad[0]) / 2, (new_shape[0] - new_unpad[1]) / 2
+    if shape[::-1] != new_unpad:
+        im = cv2.resize(im, new_unpad, interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+    im = cv2.copyMakeBorder(im, top, bottom, left, right, cv2.BORDER_CONSTANT, value=color)
+    return im, r, (dw, dh)
+
+def autoshape_input_shape(shapes, size, stride):
+    # common network input shape for a list of (h, w) image shapes, as AutoShape computes it
+    size = (size, size) if isinstance(size, int) else size
+    shape1 = []
+    for s in shapes:
+        g = max(size) / max(s)
+        shape1.append([int(y * g) for y in s])
+    return [make_divisible(x, stride) for x in np.array(shape1).max(0)]
+
+class LetterboxBuffer:
+    # reusable network input: every image is resized once into a gray uint8 canvas and converted straight
+    # into a float32 NCHW array; both are allocated once and grown only when a larger batch / shape comes in
+    def __init__(self, size=640, batch=1):
+        self.canvas = np.empty(size * size * 3, dtype=np.uint8)
+        self.input = np.empty(batch * 3 * size * size, dtype=np.float32)
+
+    def load(self, ims, size, stride, enhance=None):
+        """Letterbox ims into the buffer the way AutoShape does, returns (x, shape1, shape0).
+        enhance(content) -> content is applied to the resized pixels only, not to the padding"""
+        shape0 = [im.shape[:2] for im in ims]
+        h1, w1 = autoshape_input_shape(shape0, size, stride)
+        n = len(ims)
+        if self.canvas.size < h1 * w1 * 3:
+            self.canvas = np.empty(h1 * w1 * 3, dtype=np.uint8)
+        if self.input.size < n * 3 * h1 * w1:
+            self.input = np.empty(n * 3 * h1 * w1, dtype=np.float32)
+        canvas = self.canvas[:h1 * w1 * 3].reshape(h1, w1, 3)
+        x = self.input[:n * 3 * h1 * w1].reshape(n, 3, h1, w1)
+
+        for i, im in enumerate(ims):
+            im = im[..., :3] if im.ndim == 3 else cv2.cvtColor(im, cv2.COLOR_GRAY2BGR)
+            h0, w0 = shape0[i]
+            r = min(h1 / h0, w1 / w0)
+            new_w, new_h = int(round(w0 * r)), int(round(h0 * r))
+            top, left = int(round((h1 - new_h) / 2 - 0.1)), int(round((w1 - new_w) / 2 - 0.1))
+            canvas[:] = LETTERBOX_COLOR
+            content = canvas[top:top + new_h, left:left + new_w]
+            if (new_h, new_w) == (h0, w0):
+                content[:] = im
+            else:
+                content[:] = cv2.resize(im, (new_w, new_h),
+                                        interpolation=cv2.INTER_AREA if r < 1 else cv2.INTER_LINEAR)
+            if enhance is not None:
+                content[:] = enhance(content)
+            np.divide(canvas.transpose(2, 0, 1), np.float32(255), out=x[i])
+        return x, (h1, w1), shape0
+
+def xywh2xyxy(x):
+    y = np.empty_like(x)
+    y[:, 0] = x[:, 0] - x[:, 2] / 2
+    y[:, 1] = x[:, 1] - x[:, 3] / 2
+    y[:, 2] = x[:, 0] + x[:, 2] / 2
+    y[:, 3] = x[:, 1] + x[:, 3] / 2
+    return y
+
+def nms(boxes, scores, iou_thres):
+    # greedy NMS, same ordering and tie-breaking as torchvision.ops.nms
+    order = np.argsort(-scores, kind='stable')
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        xx1 = np.maximum(x1[i], x1[rest])
+        yy1 = np.maximum(y1[i], y1[rest])
+        xx2 = np.minimum(x2[i], x2[rest])
+        yy2 = np.minimum(y2[i], y2[rest])
+        inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        iou = inter / (areas[i] + areas[rest] - inter)
+        order = rest[iou <= iou_thres]
+    return np.array(keep, dtype=np.int64)
+
+def non_max_suppression(prediction, conf_thres, iou_thres=IOU_THRES, max_det=MAX_DET):
+    # prediction: (batch, anchors, 5 + nc) raw yolov5 output -> list of (n, 6) [x1, y1, x2, y2, conf, cls]
+    output = [np.zeros((0, 6), dtype=np.float32) for _ in range(prediction.shape[0])]
+    xc = prediction[..., 4] > conf_thres
+    for xi, x in enumerate(prediction):
+        x = x[xc[xi]].copy()
+        if not x.shape[0]:
+            continue
+        x[:, 5:] *= x[:, 4:5]
+        box = xywh2xyxy(x[:, :4])
+        j = x[:, 5:].argmax(1)
+        conf = x[np.arange(len(j)), 5 + j]
+        x = np.concatenate((box, conf[:, None], j[:, None].astype(np.float32)), 1)[conf > conf_thres]
+        if not x.shape[0]:
+            continue
+        x = x[np.argsort(-x[:, 4], kind='stable')[:MAX_NMS]]
+        offsets = x[:, 5:6] * MAX_WH
+        keep = nms(x[:, :4] + offsets, x[:, 4], iou_thres)[:max_det]
+        output[xi] = x[keep]
+    return output
+
+def scale_boxes(img1_shape, boxes, img0_shape):
+    # map boxes from the letterboxed network shape back to the original image shape
+    gain = min(img1_shape[0] / img0_shape[0], img1_shape[1] / img0_shape[1])
+    pad = (img1_shape[1] - img0_shape[1] * gain) / 2, (img1_shape[0] - img0_shape[0] * gain) / 2
+    boxes[:, [0, 2]] -= pad[0]
+    boxes[:, [1, 3]] -= pad[1]
+    boxes[:, :4] /= gain
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, img0_shape[1])
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, img0_shape[0])
+    return boxes
@@ -11,6 +11,11 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 import paho.mqtt.client as mqtt
 from image_uploader import ImageUploader
 from ticket_system import TicketManager, WalkInTicket, BookingTicket
+from function.plate_vote import PlateVoter, normalize_plate, plate_distance
+from function import resource_governor
+from function.live_tracker import LivePlateTracker
+from function.plate_tracker import MAX_DISAGREEMENT
+from function.motion_gate import MotionGate, SpeculativeSlot
 
 # Suppress OpenCV warnings
 os.environ['OPENCV_LOG_LEVEL'] = 'ERROR'
@@ -91,7 +96,8 @@ class SystemFunctions:
         self.mqtt_gate2 = MQTTGate2(config, self)
         
         # Thread pool cho xu ly song song
-        self.executor = ThreadPoolExecutor(max_workers=8)
+        self.executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='xparking',
+                                           initializer=resource_governor.thread_initializer('io'))
         
         # Locks rieng cho tung gate
         self.gate1_entry_lock = threading.Lock()
@@ -110,6 +116,38 @@ class SystemFunctions:
         self.config.current_exit_plate_gate2 = None
         self.config.qr_scan_result_gate2 = None
 
+        # Nhận diện liên tục (tuỳ chọn): mỗi camera 1 tracker, xe đến barrier thì đã có biển số
+        self.live_trackers = {}
+        if config.config.get('lpr_continuous'):
+            for camera_type in ('in', 'out'):
+                tracker = LivePlateTracker(
+                    lpr, lambda camera_type=camera_type: self.gui.capture_frame(camera_type), camera_type,
+                    profile=camera_type,
+                    interval=config.config.get('lpr_continuous_interval', 0.2),
+                    max_ocr=int(config.config.get('lpr_continuous_max_ocr', 3)),
+                    hold=config.config.get('lpr_continuous_hold', 0.6),
+                    min_agree=int(config.config.get('lpr_burst_agree', 2))
+                )
+                tracker.start()
+                self.live_trackers[camera_type] = tracker
+
+        # Chấm độ nét trên vùng ROI biển số của từng camera (đọc lại profile mỗi frame, sửa file profile là có hiệu lực)
+        for camera_type, buffer in gui.frame_buffers.items():
+            buffer.roi = lambda camera_type=camera_type: lpr.profiles.get(camera_type).roi
+
+        # Nhận diện trước khi có trigger (tuỳ chọn): camera thấy xe di chuyển trong ROI thì chạy LPR ngay
+        self.speculative = {}
+        self.speculative_gate = int(config.config.get('lpr_speculative_gate', 1))
+        self.last_triggers = {}  # camera -> (thời điểm trigger, biển số đã xử lý)
+        if config.config.get('lpr_motion_gate'):
+            for camera_type in ('in', 'out'):
+                gate = MotionGate(roi=lambda camera_type=camera_type: lpr.profiles.get(camera_type).roi,
+                                  threshold=config.config.get('lpr_motion_threshold', 25),
+                                  min_fraction=config.config.get('lpr_motion_min_fraction', 0.01),
+                                  sustain=int(config.config.get('lpr_motion_frames', 3)))
+                self.speculative[camera_type] = SpeculativeSlot(config.config.get('lpr_speculative_window', 3.0))
+                gui.set_motion_gate(camera_type, gate, self._on_motion)
+
     # === MQTT ===
     def init_mqtt(self):
         """Khoi tao MQTT cho ca 2 gates"""
@@ -180,7 +218,7 @@ class SystemFunctions:
             
             # 2. Nhận diện BSX
             logger.info("🔍 Đang nhận diện biển số...")
-            plate = self._recognize_plate(frame)
+            plate, frame = self._recognize_plate_burst(frame, 'in', gate=1)
             if not plate:
                 logger.error("❌ Không nhận diện được BSX")
                 self._entry_error("KHONG NHAN DIEN")
@@ -346,7 +384,7 @@ class SystemFunctions:
                 self._exit_error("LOI CAMERA")
                 return
             
-            plate = self._recognize_plate(frame)
+            plate, frame = self._recognize_plate_burst(frame, 'out', gate=1)
             if not plate:
                 self._exit_error("KHONG NHAN DIEN BSX", "VUI LONG THU LAI")
                 return
@@ -638,13 +676,19 @@ class SystemFunctions:
         self._display("out", "X-PARKING", "Exit")
 
     # === HELPERS ===
-    def _recognize_plate(self, frame):
+    def _recognize_plate(self, frame, profile=None):
         """Nhận diện biển số - trả về plate string hoặc None"""
+        plate_info = self._read_plate_info(frame, profile)
+        return plate_info['plate'] if plate_info else None
+
+    def _read_plate_info(self, frame, profile=None):
+        """Nhận diện 1 frame - trả về {'plate', 'confidence', 'cached'} hoặc None
+        profile: tên profile LPR của camera (ROI, ngưỡng), xem 'lpr_profiles' trong config"""
         try:
             if not self.lpr.is_ready():
                 self.lpr.load_models()
             
-            result = self.lpr.detect_and_read_plate(frame)
+            result = self.lpr.detect_and_read_plate(frame, profile=profile)
             
             if result['success'] and result['plates']:
                 plate_info = result['plates'][0]
@@ -652,14 +696,115 @@ class SystemFunctions:
                 # Bỏ dấu - khỏi biển số (98K1-02897 -> 98K102897)
                 plate = plate.replace('-', '').replace(' ', '')
                 conf = plate_info.get('confidence', 0)
+                timing = result.get('timing', {})
                 if len(plate) >= 4:
-                    logger.debug(f"LPR: {plate} (conf: {conf:.2f})")
-                    return plate
+                    logger.debug(f"LPR: {plate} (conf: {conf:.2f}, stage: {result.get('stage')}, "
+                                 f"cho {timing.get('queue_wait_ms', 0):.0f}ms, "
+                                 f"xu ly {timing.get('inference_ms', 0):.0f}ms)")
+                    return {'plate': plate, 'confidence': conf, 'cached': plate_info.get('cached', False)}
             return None
         except Exception as e:
             logger.error(f"LPR error: {e}")
             return None
 
+    def _recognize_plate_burst(self, frame, camera_type, gate=1):
+        """Biển số cho handler: tracker liên tục -> kết quả nhận diện trước (motion gate) -> burst mới
+        - trả về (plate hoặc None, frame tương ứng để lưu ảnh)"""
+        triggered = time.monotonic()
+        previous = self.last_triggers.get(camera_type, (None, None))
+        result = self._plate_for_trigger(frame, camera_type, gate, previous)
+        self.last_triggers[camera_type] = (triggered, result[0])
+        tracker = self.live_trackers.get(camera_type)
+        if tracker:
+            tracker.consume()
+        return result
+
+    def _plate_for_trigger(self, frame, camera_type, gate, previous):
+        tracker = self.live_trackers.get(camera_type)
+        confirmed = tracker.confirmed_plate() if tracker else None
+        if confirmed and previous[1] and normalize_plate(confirmed[0]) == normalize_plate(previous[1]):
+            # vẫn là xe của trigger trước (track mới của cùng 1 xe)
+            logger.info(f"[GATE{gate}] Bỏ biển số tracking {confirmed[0]} (trùng xe vừa xử lý)")
+            confirmed = None
+        if confirmed:
+            # biển số đã được tracker xác nhận trước khi có trigger, không chạy LPR lại
+            logger.info(f"[GATE{gate}] LPR tracking: {confirmed[0]}")
+            return confirmed
+
+        # nhận diện trước chạy với profile của 1 cổng, cổng kia không dùng
+        slot = self.speculative.get(camera_type) if gate == self.speculative_gate else None
+        # chỉ lấy kết quả bắt đầu sau trigger trước (không phải của xe vừa đi qua)
+        speculative = slot.take(not_before=previous[0]) if slot else None
+        if speculative:
+            if self._confirm_speculative(speculative[0], previous[1], frame, camera_type, gate):
+                logger.info(f"[GATE{gate}] LPR nhận diện trước: {speculative[0]}")
+                return speculative
+            logger.info(f"[GATE{gate}] Bỏ kết quả nhận diện trước {speculative[0]} (không khớp xe hiện tại)")
+
+        return self._recognize_plate_frames(frame, camera_type, gate)
+
+    def _confirm_speculative(self, plate, previous_plate, frame, camera_type, gate):
+        """Kết quả nhận diện trước có phải của xe đang ở barrier không: khác biển số vừa xử lý và
+        1 lượt detect nhanh + OCR YOLO (không chờ tesseract) trên frame trigger đọc gần giống (lệch <= 2 ký tự)"""
+        if plate == previous_plate:
+            return False
+        profile = f"{camera_type}_gate{gate}"
+        boxes = self.lpr.detect_plates(frame, profile, fast=True)
+        if not len(boxes):
+            return False
+        # biển số to nhất = xe gần camera nhất
+        box = max(boxes, key=lambda b: (b[2] - b[0]) * (b[3] - b[1]))
+        text = self.lpr.read_plates_batch([self.lpr.crop_plate(frame, box)], stages=('ocr',))[0]
+        if text == "unknown":
+            return False
+        return plate_distance(normalize_plate(text), plate) <= MAX_DISAGREEMENT
+
+    def _on_motion(self, camera_type, frame):
+        """[CAMERA THREAD] Có chuyển động trong ROI - nhận diện trước, không chặn thread camera"""
+        slot = self.speculative.get(camera_type)
+        if slot is None or slot.busy() or not self.lpr.is_ready():
+            return
+        slot.start(self.executor.submit(self._speculate, frame, camera_type, self.speculative_gate))
+
+    def _speculate(self, frame, camera_type, gate):
+        plate, frame = self._recognize_plate_frames(frame, camera_type, gate)
+        if plate:
+            logger.debug(f"LPR nhận diện trước ({camera_type}): {plate}")
+        return (plate, frame) if plate else None
+
+    def _recognize_plate_frames(self, frame, camera_type, gate=1):
+        """Nhận diện trên nhiều frame liên tiếp, dừng ngay khi đủ frame đọc giống nhau
+        - trả về (plate hoặc None, frame tương ứng để lưu ảnh)"""
+        profile = f"{camera_type}_gate{gate}"
+        burst_frames = max(1, int(self.config.config.get('lpr_burst_frames', 1)))
+        if burst_frames == 1:
+            return self._recognize_plate(frame, profile), frame
+
+        voter = PlateVoter(int(self.config.config.get('lpr_burst_agree', 2)))
+        interval = self.config.config.get('lpr_burst_interval', 0.04)
+        since = time.monotonic()
+        for i in range(burst_frames):
+            if i > 0:
+                # chờ camera có frame mới (nét nhất trong các frame chưa đọc)
+                time.sleep(interval)
+                frame, since = self.gui.capture_newer_frame(camera_type, since, gate=gate)
+                if frame is None:
+                    continue
+            plate_info = self._read_plate_info(frame, profile)
+            if not plate_info:
+                continue
+            plate = voter.add(plate_info['plate'], plate_info['confidence'], frame, plate_info['cached'])
+            if plate:
+                logger.debug(f"[GATE{gate}] LPR burst: {plate} sau {i + 1} frame")
+                return plate, voter.best_payload(plate)
+
+        # hết burst mà chưa đủ frame giống nhau: bầu từng ký tự
+        plate = voter.vote()
+        if not plate:
+            return None, frame
+        logger.debug(f"[GATE{gate}] LPR burst vote: {plate} tu {len(voter.readings)} frame")
+        return plate, voter.best_payload(plate)
+
     # === IMAGE UPLOAD HELPERS ===
     def _upload_entry_image(self, frame, ticket_code):
         """Upload ảnh xe vào (chạy async)"""
@@ -824,7 +969,7 @@ class SystemFunctions:
                 return
             
             # Recognize plate
-            plate = self._recognize_plate(frame)
+            plate, frame = self._recognize_plate_burst(frame, 'in', gate=2)
             if not plate:
                 self._display("in", "KHONG NHAN DIEN BSX", "VUI LONG THU LAI", gate=2)
                 return
@@ -890,7 +1035,7 @@ class SystemFunctions:
                 return
             
             # Recognize plate
-            plate = self._recognize_plate(frame)
+            plate, frame = self._recognize_plate_burst(frame, 'out', gate=2)
             if not plate:
                 self._display("out", "KHONG NHAN DIEN", "VUI LONG THU LAI", gate=2)
                 return
@@ -1070,4 +1215,6 @@ class SystemFunctions:
         logger.info("Shutting down...")
         self.mqtt_gate1.disconnect()
         self.mqtt_gate2.disconnect()
+        for tracker in self.live_trackers.values():
+            tracker.stop()
         self.executor.shutdown(wait=False)
@@ -8,6 +8,7 @@ import requests
 import logging
 import numpy as np
 from datetime import datetime
+from function.enhance import enhance
 
 logger = logging.getLogger('XParking.ImageUploader')
 
@@ -65,13 +66,8 @@ class ImageUploader:
             # Giảm noise nhẹ để compress tốt hơn
             frame = cv2.bilateralFilter(frame, 5, 50, 50)
             
-            # Điều chỉnh độ sáng/tương phản cho ảnh xe
-            lab = cv2.cvtColor(frame, cv2.COLOR_BGR2LAB)
-            l, a, b = cv2.split(lab)
-            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(4,4))
-            l = clahe.apply(l)
-            frame = cv2.merge([l, a, b])
-            frame = cv2.cvtColor(frame, cv2.COLOR_LAB2BGR)
+            # Điều chỉnh độ sáng/tương phản cho ảnh xe (bỏ qua nếu ảnh đã đủ sáng)
+            frame = enhance(frame, clip_limit=2.0, tile_grid=(4, 4), source='upload')
             
             return frame
             
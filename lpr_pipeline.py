@@ -0,0 +1,216 @@
+"""
+LPR_PIPELINE.PY - Chạy nhận diện biển số theo dây chuyền detect / OCR
+Mỗi bước có 1 luồng riêng, nối với nhau bằng hàng đợi giới hạn: trong lúc OCR biển số của
+frame N thì detector đã chạy frame N+1, giờ cao điểm detector và OCR không phải chờ nhau.
+  - detect: cắt ROI, prefilter, lượt detector nhanh (hoặc lượt đầy đủ khi tắt cascade)
+  - ocr: đọc các biển số vừa tìm được
+  - enhanced: frame lượt nhanh chưa đọc được -> detector + OCR đầy đủ (deskew, multiscale, tesseract)
+Hàng đợi đầy thì bước trước chờ (back-pressure), stats() cho biết độ bận từng bước và độ dài hàng đợi.
+
+Cách dùng (main.py):
+    lpr_system = LPRPipeline(OptimizedLPR(config), config)   # config['lpr_pipeline'] = True
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from function import resource_governor
+
+logger = logging.getLogger('XParking.LPRPipeline')
+
+class _Job:
+    def __init__(self, frame, profile=None):
+        self.frame = frame
+        self.profile = profile
+        self.scope = getattr(profile, 'name', profile)  # plate cache scope, the camera name
+        self.future = Future()
+        self.submitted = time.perf_counter()
+        self.queued = self.submitted
+        self.roi = None
+        self.offset = (0, 0)
+        self.replica = None
+        self.stage = None
+        self.pending = []
+        self.plates = [[]]
+        self.found = [False]
+        self.fallbacks = [[]]  # fast readings that were valid but not confident
+        self.prefiltered = False
+        self.timings = {}
+
+class _Stage:
+    def __init__(self, name: str, handler, maxsize: int):
+        self.name = name
+        self.handler = handler
+        self.queue = queue.Queue(maxsize)
+        self.lock = threading.Lock()
+        self.thread = None
+        self.started = None
+        self.stats = {'items': 0, 'busy': 0.0, 'wait': 0.0, 'depth_sum': 0, 'max_depth': 0}
+
+    def put(self, job):
+        if job is not None:
+            job.queued = time.perf_counter()
+        # blocks while the queue is full: the stage before waits instead of piling up frames
+        self.queue.put(job)
+        depth = self.queue.qsize()
+        with self.lock:
+            self.stats['depth_sum'] += depth
+            self.stats['max_depth'] = max(self.stats['max_depth'], depth)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            stats = dict(self.stats)
+        items = stats['items']
+        elapsed = time.perf_counter() - self.started if self.started else 0.0
+        return {
+            'items': items,
+            'occupancy': stats['busy'] / elapsed if elapsed > 0 else 0.0,
+            'mean_ms': stats['busy'] / items * 1000 if items else 0.0,
+            'mean_wait_ms': stats['wait'] / items * 1000 if items else 0.0,
+            'queue_depth': self.queue.qsize(),
+            'mean_queue_depth': stats['depth_sum'] / items if items else 0.0,
+            'max_queue_depth': stats['max_depth'],
+        }
+
+class LPRPipeline:
+    """Đứng trước OptimizedLPR, cùng interface detect_and_read_plate()"""
+    DEFAULT_QUEUE_SIZE = 4
+
+    def __init__(self, lpr, config: dict | None = None):
+        config = config or {}
+        self.lpr = lpr
+        queue_size = max(1, int(config.get('lpr_pipeline_queue_size', self.DEFAULT_QUEUE_SIZE)))
+        self.stages = {name: _Stage(name, handler, queue_size) for name, handler in
+                       (('detect', self._detect), ('ocr', self._ocr), ('enhanced', self._enhanced))}
+        self.lock = threading.Lock()
+        self.running = False
+
+    def __getattr__(self, name):
+        # các hàm khác (load_models, is_ready, get_best_plate, ...) dùng thẳng của OptimizedLPR
+        return getattr(self.lpr, name)
+
+    def start(self):
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+            for stage in self.stages.values():
+                stage.started = time.perf_counter()
+                stage.thread = threading.Thread(target=self._worker, args=(stage,),
+                                                name=f'lpr-pipe-{stage.name}', daemon=True)
+                stage.thread.start()
+        logger.info(f"LPR pipeline: {', '.join(self.stages)}, "
+                    f"hàng đợi tối đa {self.stages['detect'].queue.maxsize} frame mỗi bước")
+
+    def stop(self):
+        with self.lock:
+            if not self.running:
+                return
+            self.running = False
+        # frames already queued are finished, the marker is passed on from stage to stage
+        self.stages['detect'].put(None)
+
+    def detect_and_read_plate(self, frame, profile=None) -> dict:
+        if not self.lpr.models_loaded:
+            return {'success': False, 'plates': [], 'error': "Models not loaded"}
+
+        if frame is None or frame.size == 0:
+            return {'success': False, 'plates': [], 'error': "Input frame is empty"}
+
+        if not self.running:
+            self.start()
+
+        job = _Job(frame, profile)
+        self.stages['detect'].put(job)
+        return job.future.result()
+
+    def stats(self) -> dict:
+        return {name: stage.snapshot() for name, stage in self.stages.items()}
+
+    def log_stats(self):
+        for name, stats in self.stats().items():
+            logger.info(f"Pipeline {name}: {stats['items']} frame, bận {stats['occupancy']:.0%}, "
+                        f"{stats['mean_ms']:.1f}ms/frame, chờ {stats['mean_wait_ms']:.1f}ms, "
+                        f"hàng đợi tb {stats['mean_queue_depth']:.1f} / max {stats['max_queue_depth']}")
+
+    def _worker(self, stage: _Stage):
+        resource_governor.pin('inference')
+        names = list(self.stages)
+        following = self.stages[names[names.index(stage.name) + 1]] if stage.name != names[-1] else None
+        while True:
+            job = stage.queue.get()
+            if job is None:
+                if following is not None:
+                    following.put(None)
+                break
+            started = time.perf_counter()
+            job.timings[f'{stage.name}_wait_ms'] = (started - job.queued) * 1000
+            try:
+                target = stage.handler(job)
+            except Exception as e:
+                logger.error(f"Pipeline {stage.name} error: {e}")
+                if not job.future.done():
+                    job.future.set_result({'success': False, 'plates': [], 'error': str(e)})
+                target = None
+            finally:
+                with stage.lock:
+                    stage.stats['items'] += 1
+                    stage.stats['busy'] += time.perf_counter() - started
+                    stage.stats['wait'] += started - job.queued
+            if target is not None:
+                self.stages[target].put(job)
+
+    def _detect(self, job: _Job) -> str | None:
+        # returns the stage the job goes to next, None when it is finished
+        lpr = self.lpr
+        job.profile = lpr.profiles.get(job.profile)
+        job.roi, job.offset = job.profile.crop(job.frame)
+        if lpr.prefilter is not None:
+            start = time.perf_counter()
+            job.prefiltered = not lpr.prefilter.check(job.roi)
+            job.timings['prefilter_ms'] = (time.perf_counter() - start) * 1000
+            if job.prefiltered:
+                return self._finish(job)
+        job.stage = 'fast' if lpr.cascade else 'enhanced'
+        self._find(job)
+        return 'ocr'
+
+    def _ocr(self, job: _Job) -> str | None:
+        start = time.perf_counter()
+        self.lpr._read_candidates(job.stage, job.replica, job.pending, job.plates, job.fallbacks)
+        job.timings[f'{job.stage}_ocr_ms'] = (time.perf_counter() - start) * 1000
+        if job.stage == 'fast' and not job.plates[0]:
+            job.stage = 'enhanced'
+            return 'enhanced'
+        self.lpr._use_fallbacks(job.plates, job.fallbacks)
+        return self._finish(job)
+
+    def _enhanced(self, job: _Job) -> str | None:
+        self._find(job)
+        return self._ocr(job)
+
+    def _find(self, job: _Job):
+        # the replica is held for the detector pass only, its OCR model is used by the next stage
+        start = time.perf_counter()
+        replica = self.lpr.replica_pool.get()
+        try:
+            job.pending = self.lpr._stage_candidates(job.stage, replica, [(job.roi, job.offset)], [job.profile],
+                                                     [0], job.plates, job.found, [job.scope])
+        finally:
+            self.lpr.replica_pool.put(replica)
+        job.replica = replica
+        job.timings[f'{job.stage}_detect_ms'] = (time.perf_counter() - start) * 1000
+
+    def _finish(self, job: _Job) -> None:
+        result = self.lpr._frame_result(job.plates[0], job.found[0], job.offset, job.prefiltered, job.timings)
+        done = time.perf_counter()
+        waits = sum(value for key, value in job.timings.items() if key.endswith('_wait_ms'))
+        result['timing'].update({
+            'replica': job.replica.index if job.replica is not None else None,
+            'queue_wait_ms': waits,
+            'inference_ms': (done - job.submitted) * 1000 - waits,
+        })
+        job.future.set_result(result)
+        return None
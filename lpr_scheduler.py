@@ -0,0 +1,142 @@
+"""
+LPR_SCHEDULER.PY - Gom batch nhận diện biển số giữa các cổng
+Các frame từ handle_entry / handle_exit (Gate 1, Gate 2) đến cách nhau vài ms được chạy
+chung 1 lượt detector + 1 lượt OCR, mỗi caller nhận lại kết quả của riêng mình.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from function import resource_governor
+
+logger = logging.getLogger('XParking.LPRScheduler')
+
+class _Request:
+    def __init__(self, frame, profile=None):
+        self.frame = frame
+        self.profile = profile
+        self.future = Future()
+        self.submitted = time.perf_counter()
+        self.under_load = False
+
+class InferenceScheduler:
+    """Đứng trước OptimizedLPR, cùng interface detect_and_read_plate()"""
+    DEFAULT_MAX_DELAY_MS = 5
+    DEFAULT_MAX_BATCH = 4
+    BURST_WINDOW = 1.0  # chỉ chờ gom batch khi có request khác trong 1s gần nhất
+
+    def __init__(self, lpr, config: dict | None = None):
+        config = config or {}
+        self.lpr = lpr
+        self.max_delay = config.get('lpr_batch_max_delay_ms', self.DEFAULT_MAX_DELAY_MS) / 1000
+        self.max_batch = max(1, int(config.get('lpr_batch_max_size', self.DEFAULT_MAX_BATCH)))
+        self.requests = queue.Queue()
+        self.last_arrival = 0.0
+        self.lock = threading.Lock()
+        self.workers = []
+        self.running = False
+        self.stats = {'batches': 0, 'frames': 0}
+
+    def __getattr__(self, name):
+        # các hàm khác (load_models, is_ready, get_best_plate, ...) dùng thẳng của OptimizedLPR
+        return getattr(self.lpr, name)
+
+    def start(self):
+        with self.lock:
+            if self.running:
+                return
+            self.running = True
+            self.workers = [threading.Thread(target=self._worker, name=f'lpr-batch-{i}', daemon=True)
+                            for i in range(max(1, len(self.lpr.replicas)))]
+            for worker in self.workers:
+                worker.start()
+        logger.info(f"LPR batching: {len(self.workers)} worker(s), "
+                    f"max delay {self.max_delay * 1000:.0f}ms, max batch {self.max_batch}")
+
+    def stop(self):
+        self.running = False
+        for _ in self.workers:
+            self.requests.put(None)
+
+    def detect_and_read_plate(self, frame, profile=None) -> dict:
+        if not self.lpr.models_loaded:
+            return {'success': False, 'plates': [], 'error': "Models not loaded"}
+
+        if frame is None or frame.size == 0:
+            return {'success': False, 'plates': [], 'error': "Input frame is empty"}
+
+        if not self.running:
+            self.start()
+
+        request = _Request(frame, profile)
+        with self.lock:
+            request.under_load = request.submitted - self.last_arrival < self.BURST_WINDOW
+            self.last_arrival = request.submitted
+        self.requests.put(request)
+        return request.future.result()
+
+    def _collect(self, first) -> list:
+        batch = [first]
+        # lấy hết request đang chờ sẵn, không tốn thêm thời gian
+        while len(batch) < self.max_batch:
+            try:
+                request = self.requests.get_nowait()
+            except queue.Empty:
+                break
+            if request is None:
+                self.requests.put(None)
+                return batch
+            batch.append(request)
+
+        # chỉ 1 xe lẻ thì chạy ngay, đang cao điểm thì chờ thêm tối đa max_delay
+        if len(batch) == 1 and (self.max_delay <= 0 or not first.under_load):
+            return batch
+        deadline = first.submitted + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self.requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                self.requests.put(None)
+                break
+            batch.append(request)
+        return batch
+
+    def _worker(self):
+        resource_governor.pin('inference')
+        while self.running:
+            request = self.requests.get()
+            if request is None:
+                break
+            self._process(self._collect(request))
+
+    def _process(self, batch):
+        started = time.perf_counter()
+        replica = self.lpr.replica_pool.get()
+        try:
+            results = self.lpr._detect_and_read_batch(replica, [request.frame for request in batch],
+                                                      [request.profile for request in batch])
+        except Exception as e:
+            logger.error(f"Batch inference error: {e}")
+            results = [{'success': False, 'plates': [], 'error': str(e)} for _ in batch]
+        finally:
+            self.lpr.replica_pool.put(replica)
+
+        done = time.perf_counter()
+        with self.lock:
+            self.stats['batches'] += 1
+            self.stats['frames'] += len(batch)
+        for request, result in zip(batch, results):
+            result.setdefault('timing', {}).update({
+                'replica': replica.index,
+                'batch_size': len(batch),
+                'queue_wait_ms': (started - request.submitted) * 1000,
+                'inference_ms': (done - started) * 1000,
+            })
+            request.future.set_result(result)
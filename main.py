@@ -10,7 +10,10 @@ from functions import SystemFunctions
 
 # Modules bên ngoài
 from QUET_BSX import OptimizedLPR
+from lpr_scheduler import InferenceScheduler
+from lpr_pipeline import LPRPipeline
 from db_api import DatabaseAPI
+from function import resource_governor
 
 # Cấu hình logging - format ngắn gọn
 logging.basicConfig(
@@ -32,8 +35,15 @@ class XParkingSystem:
         
         # Khởi tạo các thành phần cốt lõi
         self.config_manager = SystemConfig()
+        # chia luồng / core cho AI trước khi tạo model, luồng chính (Tk) và các luồng con chạy trên core I/O
+        resource_governor.configure(self.config_manager.config)
+        resource_governor.pin('io')
         self.gui_manager = GUIManager(self.config_manager)
-        self.lpr_system = OptimizedLPR()
+        self.lpr_system = OptimizedLPR(self.config_manager.config)
+        if self.config_manager.config.get('lpr_pipeline'):
+            self.lpr_system = LPRPipeline(self.lpr_system, self.config_manager.config)
+        elif self.config_manager.config.get('lpr_batching'):
+            self.lpr_system = InferenceScheduler(self.lpr_system, self.config_manager.config)
         self.db_api = DatabaseAPI(self.config_manager.config)
         self.email_handler = EmailHandler(self.config_manager)
         
@@ -105,6 +115,10 @@ class XParkingSystem:
                 if self.root:
                     self.root.after(0, lambda: self.gui_manager.update_status('ai_status', True))
                 logger.info("AI model đã load thành công")
+                stats = self.lpr_system.load_stats
+                resource_governor.log_diagnostics({'lpr_backend': stats.get('backend'),
+                                                   'lpr_replicas': stats.get('replicas'),
+                                                   'threads_per_replica': stats.get('threads_per_replica')})
             else:
                 if self.root:
                     self.root.after(0, lambda: self.gui_manager.update_status('ai_status', False))
@@ -122,6 +136,21 @@ class XParkingSystem:
                 self.functions.shutdown()
         except Exception as e:
             logger.error(f"Lỗi khi tắt functions: {e}")
+
+        if isinstance(getattr(self, 'lpr_system', None), (InferenceScheduler, LPRPipeline)):
+            self.lpr_system.stop()
+        if isinstance(getattr(self, 'lpr_system', None), LPRPipeline):
+            self.lpr_system.log_stats()
+
+        if hasattr(self, 'lpr_system'):
+            stats = self.lpr_system.get_enhance_stats()
+            logger.info(f"Enhance: {stats['frames']} frame (skip {stats['skip']}, lut {stats['lut']}, "
+                        f"clahe {stats['clahe']}), tiet kiem ~{stats['saved_ms_per_frame']:.1f}ms/frame")
+            stats = self.lpr_system.get_prefilter_stats()
+            if stats:
+                logger.info(f"Prefilter: {stats['checked']} frame, bo qua detector {stats['detector_runs_saved']} lan "
+                            f"({stats['reject_rate']:.0%}, nguong {stats['threshold']:.2f})")
+            self.lpr_system.shutdown()
         
         logger.info("Hệ thống đã tắt hoàn toàn")
 
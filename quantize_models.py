@@ -0,0 +1,149 @@
+"""
+QUANTIZE_MODELS.PY - Lượng tử hoá động int8 cho model ONNX (detector + OCR) và báo cáo fp32 vs int8
+  - model/*.onnx chưa có thì export từ model/*.pt trước (giống export_models.py)
+  - tạo model/*.int8.onnx, bật bằng SystemConfig['lpr_precision'] = 'int8' (lpr_backend 'onnx' hoặc 'auto')
+  - báo cáo: chạy cả 2 chế độ trên bộ ảnh đã lưu (img_in_gate1, img_out_gate1, tên file = biển số),
+    so sánh thời gian xử lý và tỉ lệ đọc đúng biển số để quyết định từng bãi có nên dùng int8 không
+
+Cách dùng:
+    python quantize_models.py
+    python quantize_models.py --per-channel --report quantize_report.json
+    python quantize_models.py --skip-quantize --corpus img_in_gate1 --limit 200
+"""
+import argparse
+import json
+import logging
+import os
+import time
+
+import cv2
+
+from QUET_BSX import OptimizedLPR
+from function.lpr_corpus import CORPUS_DIRS, load_corpus, is_correct, latency_summary
+
+logger = logging.getLogger('XParking.Quantize')
+
+MODELS = [
+    (OptimizedLPR.LP_DETECTOR_MODEL_PATH, OptimizedLPR.LP_DETECTOR_ONNX_PATH),
+    (OptimizedLPR.OCR_MODEL_PATH, OptimizedLPR.OCR_ONNX_PATH),
+]
+
+def ensure_onnx(pt_path, onnx_path):
+    if os.path.exists(onnx_path):
+        return True
+    if not os.path.exists(pt_path):
+        logger.error(f"Model not found: {pt_path}")
+        return False
+    from export_models import load_hub_model, export_onnx
+    export_onnx(load_hub_model(pt_path), onnx_path)
+    return True
+
+def quantize(onnx_path, per_channel=False):
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    int8_path = OptimizedLPR.int8_path(onnx_path)
+    prepared = os.path.splitext(onnx_path)[0] + '.pre.onnx'
+    try:
+        # constant folding + shape inference first, so more nodes get quantized
+        quant_pre_process(onnx_path, prepared, skip_symbolic_shape=True)
+        source = prepared
+    except Exception as e:
+        logger.warning(f"{onnx_path}: pre-processing skipped ({e})")
+        source = onnx_path
+    root = logging.getLogger()
+    level = root.level
+    root.setLevel(logging.WARNING)  # the quantizer logs one INFO line per activation tensor
+    try:
+        # uint8 weights: ConvInteger / MatMulInteger kernels exist for them on every x86 CPU
+        quantize_dynamic(source, int8_path, weight_type=QuantType.QUInt8, per_channel=per_channel)
+    finally:
+        root.setLevel(level)
+        if source == prepared and os.path.exists(prepared):
+            os.remove(prepared)
+    logger.info(f"Quantized {onnx_path} -> {int8_path} "
+                f"({os.path.getsize(onnx_path) / 1e6:.1f} MB -> {os.path.getsize(int8_path) / 1e6:.1f} MB)")
+    return int8_path
+
+def evaluate(precision, samples, threads=None):
+    """Run the corpus through OptimizedLPR at one precision, returns the report section"""
+    lpr = OptimizedLPR({'lpr_backend': 'onnx', 'lpr_precision': precision, 'lpr_replicas': 1,
+                        'lpr_threads_per_replica': threads, 'lpr_cache_size': 0})
+    if not lpr.load_models():
+        return {'error': f"could not load {precision} models"}
+    latencies, correct, detected, misses = [], 0, 0, []
+    for path, label in samples:
+        frame = cv2.imread(path)
+        if frame is None:
+            continue
+        lpr.clear_cache()
+        start = time.perf_counter()
+        result = lpr.detect_and_read_plate(frame)
+        latencies.append((time.perf_counter() - start) * 1000)
+        best = lpr.get_best_plate(result)
+        text = best['text'] if best else None
+        detected += best is not None
+        if is_correct(text, label):
+            correct += 1
+        else:
+            misses.append({'image': path, 'label': label, 'read': text})
+    total = len(latencies)
+    return {
+        'load': lpr.load_stats,
+        'images': total,
+        'detected': detected,
+        'correct': correct,
+        'accuracy': correct / total if total else 0.0,
+        'latency': latency_summary(latencies),
+        'misses': misses,
+    }
+
+def print_report(report):
+    fp32, int8 = report.get('fp32', {}), report.get('int8', {})
+    print(f"\n{'':<12}{'fp32':>12}{'int8':>12}")
+    rows = [('images', 'images', '{:d}'), ('detected', 'detected', '{:d}'), ('accuracy', 'accuracy', '{:.1%}')]
+    for title, key, fmt in rows:
+        print(f"{title:<12}" + "".join(f"{fmt.format(r[key]) if key in r else '-':>12}" for r in (fp32, int8)))
+    for key in ('mean_ms', 'p50_ms', 'p95_ms', 'p99_ms'):
+        print(f"{key:<12}" + "".join(
+            f"{r['latency'][key]:>12.1f}" if key in r.get('latency', {}) else f"{'-':>12}" for r in (fp32, int8)))
+    if 'speedup' in report:
+        print(f"\nint8 speedup (mean): x{report['speedup']:.2f}, "
+              f"accuracy change: {report['accuracy_delta'] * 100:+.1f} points")
+
+def main():
+    parser = argparse.ArgumentParser(description="Dynamic int8 quantization of the XParking LPR models")
+    parser.add_argument('--per-channel', action='store_true', help="per channel weight scales")
+    parser.add_argument('--skip-quantize', action='store_true', help="only compare the existing models")
+    parser.add_argument('--corpus', nargs='+', default=list(CORPUS_DIRS), help="image dirs or files")
+    parser.add_argument('--limit', type=int, help="max number of corpus images")
+    parser.add_argument('--threads', type=int, help="onnxruntime intra-op threads (default: all cores)")
+    parser.add_argument('--report', default='quantize_report.json', help="JSON report path")
+    args = parser.parse_args()
+
+    if not args.skip_quantize:
+        for pt_path, onnx_path in MODELS:
+            if ensure_onnx(pt_path, onnx_path):
+                quantize(onnx_path, args.per_channel)
+
+    samples = load_corpus(args.corpus, args.limit)
+    if not samples:
+        logger.warning(f"No labelled images in {', '.join(args.corpus)}, report skipped")
+        return
+    logger.info(f"Evaluating {len(samples)} images")
+    report = {'corpus': args.corpus, 'per_channel': args.per_channel}
+    for precision in OptimizedLPR.PRECISIONS:
+        report[precision] = evaluate(precision, samples, args.threads)
+    fp32, int8 = report['fp32'], report['int8']
+    if fp32.get('images') and int8.get('images'):
+        report['speedup'] = fp32['latency']['mean_ms'] / int8['latency']['mean_ms']
+        report['accuracy_delta'] = int8['accuracy'] - fp32['accuracy']
+
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print_report(report)
+    logger.info(f"Report saved to {args.report}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s | %(message)s', datefmt='%H:%M:%S')
+    main()
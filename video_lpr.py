@@ -0,0 +1,152 @@
+"""
+VIDEO_LPR.PY - Quét biển số trong video đã ghi (tra soát sự cố, không cần tua tay)
+Đọc video từng frame (generator, không giữ frame trong bộ nhớ), chỉ chạy detector trên mỗi frame
+thứ --stride, theo dõi biển số bằng IoU tracker và chỉ OCR mỗi biển vài lần. Mỗi lượt xe đi qua
+trả về 1 bản ghi: biển số, thời điểm xuất hiện / biến mất trong video.
+
+Cách dùng:
+    python video_lpr.py camera_in_2025-01-05.mp4
+    python video_lpr.py record.avi --stride 3 --profile in_gate1 --output passes.csv
+"""
+import argparse
+import csv
+import json
+import logging
+import time
+
+import cv2
+
+from QUET_BSX import OptimizedLPR
+from function.plate_tracker import PlateTracker, MAX_OCR, OCR_GROWTH
+
+logger = logging.getLogger('XParking.Video')
+
+DEFAULT_STRIDE = 2
+FIELDS = ['video', 'track_id', 'plate', 'confidence', 'first_ts', 'last_ts', 'first_time', 'last_time',
+          'first_frame', 'last_frame', 'hits', 'ocr_runs', 'readings']
+
+def format_ts(seconds: float) -> str:
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(int(minutes), 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:06.3f}"
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be >= 1, got {value}")
+    return number
+
+def iter_frames(path: str, stride: int = 1):
+    """Yield (frame_index, timestamp_s, frame) for every stride-th frame; skipped frames are grabbed, not decoded"""
+    if stride < 1:
+        raise ValueError(f"stride must be >= 1, got {stride}")
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise IOError(f"Could not open video: {path}")
+    fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+    try:
+        index = 0
+        while True:
+            if index % stride:
+                if not capture.grab():
+                    break
+            else:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                yield index, index / fps, frame
+            index += 1
+    finally:
+        capture.release()
+
+def track_record(track, video: str) -> dict:
+    readings = track.voter.readings
+    return {
+        'video': video,
+        'track_id': track.id,
+        'plate': track.plate,
+        'confidence': round(max((conf for _, conf, _, _ in readings), default=0.0), 4),
+        'first_ts': round(track.first_ts, 3),
+        'last_ts': round(track.last_ts, 3),
+        'first_time': format_ts(track.first_ts),
+        'last_time': format_ts(track.last_ts),
+        'first_frame': track.first_frame,
+        'last_frame': track.last_frame,
+        'hits': track.hits,
+        'ocr_runs': track.ocr_runs,
+        'readings': len(readings),
+    }
+
+def recognize_video(lpr: OptimizedLPR, path: str, stride: int = DEFAULT_STRIDE, profile=None,
+                    tracker: PlateTracker | None = None, max_ocr: int = MAX_OCR, include_unread: bool = False):
+    """Generator of one record per vehicle pass in the video at path"""
+    tracker = tracker or PlateTracker()
+    for index, timestamp, frame in iter_frames(path, stride):
+        detections = lpr.detect_plates(frame, profile, fast=True)
+        finished = tracker.update(detections, index, timestamp)
+
+        # OCR only the tracks that are new or have come noticeably closer, all in one batch
+        pending = [track for track in tracker.active() if track.needs_ocr(max_ocr, OCR_GROWTH)]
+        if pending:
+            crops = [lpr.crop_plate(frame, track.box) for track in pending]
+            for track, text in zip(pending, lpr.read_plates_batch(crops)):
+                track.add_reading(text, track.conf)
+
+        for track in finished:
+            if track.plate or include_unread:
+                yield track_record(track, path)
+    for track in tracker.flush():
+        if track.plate or include_unread:
+            yield track_record(track, path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Plate passes in recorded video files")
+    parser.add_argument('videos', nargs='+')
+    parser.add_argument('--stride', type=positive_int, default=DEFAULT_STRIDE, help="run the detector every N frames")
+    parser.add_argument('--profile', help="LPR profile (ROI / thresholds) of the camera that recorded the video")
+    parser.add_argument('--max-ocr', type=positive_int, default=MAX_OCR, help="OCR runs per tracked plate")
+    parser.add_argument('--backend', default=OptimizedLPR.DEFAULT_BACKEND,
+                        choices=['auto', 'torchscript', 'onnx', 'torch'])
+    parser.add_argument('--include-unread', action='store_true', help="also report passes with no plate read")
+    parser.add_argument('--output', help="*.csv or *.jsonl (default: print)")
+    args = parser.parse_args()
+
+    lpr = OptimizedLPR({'lpr_backend': args.backend, 'lpr_replicas': 1, 'lpr_cache_size': 0})
+    if not lpr.load_models():
+        logger.error("Could not load LPR models")
+        return 1
+
+    out = open(args.output, 'w', newline='', encoding='utf-8') if args.output else None
+    writer = csv.DictWriter(out, fieldnames=FIELDS) if out and args.output.endswith('.csv') else None
+    if writer:
+        writer.writeheader()
+    try:
+        for video in args.videos:
+            start = time.perf_counter()
+            passes = 0
+            for record in recognize_video(lpr, video, args.stride, args.profile, max_ocr=args.max_ocr,
+                                          include_unread=args.include_unread):
+                passes += 1
+                if writer:
+                    writer.writerow(record)
+                elif out:
+                    out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                else:
+                    print(f"{record['first_time']} - {record['last_time']}  {record['plate']}  "
+                          f"(track {record['track_id']}, {record['ocr_runs']} OCR)")
+                if out:
+                    out.flush()
+            capture = cv2.VideoCapture(video)
+            duration = capture.get(cv2.CAP_PROP_FRAME_COUNT) / (capture.get(cv2.CAP_PROP_FPS) or 25.0)
+            capture.release()
+            elapsed = time.perf_counter() - start
+            logger.info(f"{video}: {passes} pass(es), {duration:.0f}s of video in {elapsed:.1f}s "
+                        f"(x{duration / max(elapsed, 1e-9):.1f} real time)")
+    finally:
+        if out:
+            out.close()
+    return 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s | %(message)s', datefmt='%H:%M:%S')
+    raise SystemExit(main())